@@ -0,0 +1,323 @@
+import math
+import os
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+from batch import replica_seeds
+from config import Config, as_config
+from schedule import Schedule
+from simulation import Simulation
+
+
+class Welford:
+    '''
+    Class for the running mean and variance of observations of a fixed shape.
+    '''
+
+    def __init__(self, shape: Tuple[int, ...] = ()) -> None:
+        '''
+        Constructor for the accumulator, every observation is an array of the shape.
+        '''
+        # Amount of observations
+        self.count: int = 0
+        # Mean of the observations
+        self.mean: np.ndarray = np.zeros(shape)
+        # Sum of the squared differences from the mean
+        self.m2: np.ndarray = np.zeros(shape)
+
+    def update(self, values: Any) -> None:
+        '''
+        Add observations, one per row of the values.
+        '''
+        values = np.asarray(values, dtype=np.float64).reshape(-1, *self.mean.shape)
+        if len(values) == 0:
+            return
+
+        batch = Welford(self.mean.shape)
+        batch.count = len(values)
+        batch.mean = values.mean(axis=0)
+        batch.m2 = ((values - batch.mean) ** 2).sum(axis=0)
+        self.merge(batch)
+
+    def merge(self, other: "Welford") -> None:
+        '''
+        Add the observations of another accumulator, as in the parallel formula of Chan et al.
+        '''
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean.copy(), other.m2.copy()
+            return
+
+        count: int = self.count + other.count
+        delta: np.ndarray = other.mean - self.mean
+        self.mean = self.mean + delta * (other.count / count)
+        self.m2 = self.m2 + other.m2 + delta ** 2 * (self.count * other.count / count)
+        self.count = count
+
+    @property
+    def var(self) -> np.ndarray:
+        '''
+        Variance of the observations.
+        '''
+        return self.m2 / self.count if self.count else np.full_like(self.m2, np.nan)
+
+    @property
+    def std(self) -> np.ndarray:
+        '''
+        Standard deviation of the observations.
+        '''
+        return np.sqrt(self.var)
+
+
+class TDigest:
+    '''
+    Class for the mergeable sketch of the quantiles of a stream of values.
+
+    Values are kept as weighted centroids. A centroid may only hold a share of
+    the values that is small near the tails and larger in the middle, so the
+    tail quantiles stay accurate while the amount of centroids grows only with
+    the logarithm of the amount of values.
+    '''
+
+    def __init__(self, compression: float = 200) -> None:
+        '''
+        Constructor for the sketch, bigger compression is more accurate and larger.
+        '''
+        self.compression: float = compression
+        # Means and weights of the centroids, sorted by the means
+        self.means: np.ndarray = np.empty(0)
+        self.weights: np.ndarray = np.empty(0)
+        # Values and weights not yet merged into the centroids
+        self.__buffer: List[Tuple[np.ndarray, np.ndarray]] = []
+        self.__buffered: int = 0
+        # Amount, smallest and largest of the values
+        self.count: float = 0
+        self.min: float = math.inf
+        self.max: float = -math.inf
+
+    def update(self, values: Any, weights: Any = None) -> None:
+        '''
+        Add values, with weight 1 each unless given.
+        '''
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if len(values) == 0:
+            return
+        weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=np.float64).ravel()
+
+        self.__buffer.append((values, weights))
+        self.__buffered += len(values)
+        self.count += float(weights.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        if self.__buffered > 10 * self.compression:
+            self.__compress()
+
+    def merge(self, other: "TDigest") -> None:
+        '''
+        Add the values of another sketch.
+        '''
+        other.__compress()
+        if other.count:
+            self.update(other.means, other.weights)
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+
+    def __compress(self) -> None:
+        '''
+        Merge the buffered values into the centroids.
+        '''
+        if not self.__buffer:
+            return
+
+        means: np.ndarray = np.concatenate([self.means, *(i[0] for i in self.__buffer)])
+        weights: np.ndarray = np.concatenate([self.weights, *(i[1] for i in self.__buffer)])
+        self.__buffer = []
+        self.__buffered = 0
+
+        order: np.ndarray = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        # Centroids take the values of one unit of the logit scale each, so the clusters near
+        # the tails hold a few values whatever the total, the scale of t-digest called k2
+        total: float = float(weights.sum())
+        quantiles: np.ndarray = (np.cumsum(weights) - weights / 2) / total
+        normalizer: float = 4 * math.log(max(total / self.compression, 1)) + 24
+        scale: np.ndarray = self.compression / normalizer * np.log(quantiles / (1 - quantiles))
+        groups: np.ndarray = np.floor(scale - scale[0]).astype(np.int64)
+        starts: np.ndarray = np.flatnonzero(np.r_[True, np.diff(groups) > 0])
+
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def quantile(self, levels: Any) -> np.ndarray:
+        '''
+        Estimated quantiles of the values at the levels between 0 and 1.
+        '''
+        self.__compress()
+        levels = np.asarray(levels, dtype=np.float64)
+        if not self.count:
+            return np.full(levels.shape, np.nan)
+
+        # Every centroid stands at the middle of its weight, the extremes at the ends
+        positions: np.ndarray = np.r_[0, np.cumsum(self.weights) - self.weights / 2, self.count]
+        means: np.ndarray = np.r_[self.min, self.means, self.max]
+
+        return np.interp(levels * self.count, positions, means)
+
+
+class PathStats:
+    '''
+    Class for the running metrics of the paths of replicas advanced together, one entry per replica.
+    '''
+
+    def __init__(self, replicas: int, startingmoney: float) -> None:
+        '''
+        Constructor for the metrics of the replicas from the starting balance.
+        '''
+        # The step number
+        self.step: int = 0
+        # Highest balance so far
+        self.peak: np.ndarray = np.full(replicas, float(startingmoney))
+        # Largest fall of the balance from a peak so far
+        self.drawdown: np.ndarray = np.zeros(replicas)
+        # Step on which the balance was first negative, -1 if it never was
+        self.ruin: np.ndarray = np.where(self.peak < 0, 0, -1)
+        # Premium income and payouts so far
+        self.premium: np.ndarray = np.zeros(replicas)
+        self.payout: np.ndarray = np.zeros(replicas)
+
+    def update(self, balance: Any, premium: Any, payout: Any) -> None:
+        '''
+        Add a step with the balance after it, its premium income and its payout.
+        '''
+        self.step += 1
+        np.maximum(self.peak, balance, out=self.peak)
+        np.maximum(self.drawdown, self.peak - balance, out=self.drawdown)
+        self.ruin[(self.ruin < 0) & (np.asarray(balance) < 0)] = self.step
+        self.premium += premium
+        self.payout += payout
+
+
+class StreamSummary:
+    '''
+    Class for the aggregates of many replicas, updated replica by replica and mergeable across workers.
+    '''
+
+    def __init__(self, steps: int, compression: float = 200) -> None:
+        '''
+        Constructor for the summary of runs of the amount of steps.
+        '''
+        # Amount of replicas added
+        self.replicas: int = 0
+        # Mean and variance of the balance per step
+        self.balance: Welford = Welford((steps + 1,))
+        # Quantiles of the balance on the last step
+        self.final: TDigest = TDigest(compression)
+        # Mean, variance and quantiles of the largest drawdown of a replica
+        self.drawdown: Welford = Welford()
+        self.drawdown_quantiles: TDigest = TDigest(compression)
+        # Amount of replicas that had a negative balance, and the steps it first happened on
+        self.ruined: int = 0
+        self.ruin_time: Welford = Welford()
+        # Premium income and payouts of all replicas
+        self.premium: float = 0.0
+        self.payout: float = 0.0
+
+    def add(self, paths: PathStats, balance: np.ndarray) -> None:
+        '''
+        Add finished replicas by their path metrics and their balances, one row per replica.
+        '''
+        balance = np.atleast_2d(balance)
+        self.replicas += len(balance)
+        self.balance.update(balance)
+        self.final.update(balance[:, -1])
+        self.drawdown.update(paths.drawdown)
+        self.drawdown_quantiles.update(paths.drawdown)
+        ruined: np.ndarray = paths.ruin[paths.ruin >= 0]
+        self.ruined += len(ruined)
+        self.ruin_time.update(ruined)
+        self.premium += float(paths.premium.sum())
+        self.payout += float(paths.payout.sum())
+
+    def merge(self, other: "StreamSummary") -> None:
+        '''
+        Add the replicas of another summary.
+        '''
+        self.replicas += other.replicas
+        self.balance.merge(other.balance)
+        self.final.merge(other.final)
+        self.drawdown.merge(other.drawdown)
+        self.drawdown_quantiles.merge(other.drawdown_quantiles)
+        self.ruined += other.ruined
+        self.ruin_time.merge(other.ruin_time)
+        self.premium += other.premium
+        self.payout += other.payout
+
+    @property
+    def ruin(self) -> float:
+        '''
+        Share of replicas that had a negative balance at some step.
+        '''
+        return self.ruined / self.replicas if self.replicas else math.nan
+
+    @property
+    def payout_ratio(self) -> float:
+        '''
+        Payouts divided by premium income over all replicas.
+        '''
+        return self.payout / self.premium if self.premium else math.inf
+
+    def to_dict(self, levels: Tuple[float, ...] = (0.05, 0.5, 0.95)) -> Dict[str, Any]:
+        '''
+        The main figures of the summary.
+        '''
+        return {
+            "replicas": self.replicas,
+            "balance": float(self.balance.mean[-1]), "std": float(self.balance.std[-1]),
+            "quantiles": dict(zip(levels, self.final.quantile(levels).tolist())),
+            "drawdown": float(self.drawdown.mean), "drawdown_quantiles":
+                dict(zip(levels, self.drawdown_quantiles.quantile(levels).tolist())),
+            "ruin": self.ruin, "ruin_time": float(self.ruin_time.mean) if self.ruined else None,
+            "payout_ratio": self.payout_ratio,
+        }
+
+
+def _stream_chunk(config: Config, seeds: List[int], compression: float,
+                  schedule: Schedule | None) -> StreamSummary:
+    '''
+    Run the replicas of a chunk and add them to a summary one by one.
+    '''
+    summary = StreamSummary(config.until, compression)
+    for seed in seeds:
+        simulation = Simulation(config, seed, schedule=schedule)
+        paths = PathStats(1, config.startingmoney)
+        running = True
+        while running:
+            result, running = simulation.step()
+            paths.update(result.balance, result.premium, result.payout)
+        summary.add(paths, simulation.stats.balance)
+
+    return summary
+
+
+def run_streaming(config: Config | str | Path = "config.json", replicas: int = 1000, seed: int | None = None,
+                  workers: int | None = None, chunk: int = 64, compression: float = 200,
+                  schedule: Schedule | None = None) -> StreamSummary:
+    '''
+    Run independent replicas across a process pool and merge their summaries, keeping no paths.
+    '''
+    config = as_config(config)
+    workers = workers or os.cpu_count() or 1
+    seeds: List[int] = replica_seeds(seed, replicas)
+    chunks: List[List[int]] = [seeds[i:i + chunk] for i in range(0, replicas, chunk)]
+
+    summary = StreamSummary(config.until, compression)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Merged in the order of the chunks, so the result does not depend on the workers
+        for partial in executor.map(_stream_chunk, [config] * len(chunks), chunks,
+                                    [compression] * len(chunks), [schedule] * len(chunks)):
+            summary.merge(partial)
+
+    return summary
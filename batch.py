@@ -0,0 +1,156 @@
+import os
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Sequence
+from config import Config, as_config
+from runcache import RunCache
+from schedule import Schedule
+from simulation import Simulation
+
+# Percentiles each worker keeps per step, the parent merges quantiles from them
+PERCENTILES: np.ndarray = np.linspace(0, 100, 101)
+
+
+class BatchPartial:
+    '''
+    Class for the per-step aggregates of one chunk of replicas.
+    '''
+
+    def __init__(self, money: np.ndarray) -> None:
+        '''
+        Constructor that reduces the balances of a chunk, one row per replica.
+        '''
+        # Amount of replicas in the chunk
+        self.replicas: int = money.shape[0]
+        # Sum of the balance per step
+        self.total: np.ndarray = money.sum(axis=0)
+        # Sum of the squared balance per step
+        self.squares: np.ndarray = (money ** 2).sum(axis=0)
+        # Amount of replicas that had a negative balance by the step
+        self.ruined: np.ndarray = np.logical_or.accumulate(money < 0, axis=1).sum(axis=0)
+        # Percentiles of the balance per step, one row per percentile
+        self.percentiles: np.ndarray = np.percentile(money, PERCENTILES, axis=0)
+
+    def state(self) -> Dict[str, np.ndarray]:
+        '''
+        Arrays holding the whole state of the aggregates.
+        '''
+        return {"replicas": np.array(self.replicas), "total": self.total, "squares": self.squares,
+                "ruined": self.ruined, "percentiles": self.percentiles}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, np.ndarray]) -> "BatchPartial":
+        '''
+        Make the aggregates back from their state.
+        '''
+        partial: BatchPartial = cls.__new__(cls)
+        partial.replicas = int(state["replicas"])
+        partial.total = state["total"]
+        partial.squares = state["squares"]
+        partial.ruined = state["ruined"]
+        partial.percentiles = state["percentiles"]
+
+        return partial
+
+
+class BatchResult:
+    '''
+    Class for the per-step aggregates of the whole batch.
+    '''
+
+    def __init__(self, partials: List[BatchPartial], quantiles: Sequence[float]) -> None:
+        '''
+        Constructor that merges the aggregates of the chunks.
+        '''
+        # Amount of replicas in the batch
+        self.replicas: int = sum(i.replicas for i in partials)
+        # The step numbers
+        self.steps: np.ndarray = np.arange(len(partials[0].total))
+        # Mean balance per step
+        self.mean: np.ndarray = sum(i.total for i in partials) / self.replicas  # type: ignore
+        # Standard deviation of the balance per step
+        self.std: np.ndarray = np.sqrt(np.maximum(
+            sum(i.squares for i in partials) / self.replicas - self.mean ** 2, 0))  # type: ignore
+        # Probability of having had a negative balance by the step
+        self.ruin: np.ndarray = sum(i.ruined for i in partials) / self.replicas  # type: ignore
+        # The quantile levels
+        self.levels: np.ndarray = np.asarray(quantiles, dtype=np.float64)
+        # Quantiles of the balance per step, one row per level
+        self.quantiles: np.ndarray = self.__merge_quantiles(partials)
+
+    def __merge_quantiles(self, partials: List[BatchPartial]) -> np.ndarray:
+        '''
+        Helper function to estimate the quantiles from the percentiles of the chunks.
+        '''
+        # Every percentile of a chunk stands for an equal share of its replicas
+        points: np.ndarray = np.concatenate([i.percentiles for i in partials])
+        weights: np.ndarray = np.concatenate(
+            [np.full(len(PERCENTILES), i.replicas / len(PERCENTILES)) for i in partials])
+
+        result: np.ndarray = np.empty((len(self.levels), len(self.steps)))
+        for step in range(len(self.steps)):
+            order: np.ndarray = np.argsort(points[:, step], kind="stable")
+            cumulative: np.ndarray = np.cumsum(weights[order]) - weights[order] / 2
+            result[:, step] = np.interp(self.levels * self.replicas,
+                                        cumulative, points[order, step])
+
+        return result
+
+
+def replica_seeds(seed: int | None, replicas: int) -> List[int]:
+    '''
+    Seeds of the replicas, every one derived from the seed of the batch.
+    '''
+    return [int(i.generate_state(1)[0]) for i in np.random.SeedSequence(seed).spawn(replicas)]
+
+
+def _run_chunk(config: Config, seeds: List[int], schedule: Schedule | None) -> BatchPartial:
+    '''
+    Run the replicas of a chunk to the end and reduce their balances.
+    '''
+    rows: List[np.ndarray] = []
+    for seed in seeds:
+        simulation = Simulation(config, seed, schedule=schedule)
+        running = True
+        while running:
+            _, running = simulation.step()
+        rows.append(simulation.stats.balance)
+
+    return BatchPartial(np.stack(rows))
+
+
+def run_batch(config: Config | str | Path = "config.json", replicas: int = 1000, seed: int | None = None,
+              workers: int | None = None, quantiles: Sequence[float] = (0.05, 0.5, 0.95),
+              chunk: int = 64, cache: bool | RunCache = True, schedule: Schedule | None = None) -> BatchResult:
+    '''
+    Run independent replicas of the simulation across a process pool, optionally with a schedule of changes.
+
+    The aggregates of a seeded batch are kept in the run cache as one entry
+    and served from it on reruns, cache=False turns that off.
+    '''
+    # Parsed once here, the workers get the config itself
+    config = as_config(config)
+    # Replicas of an unseeded batch never repeat, so they are not worth keeping
+    runs: RunCache = RunCache.resolve(cache if seed is not None else False)
+    key: str = RunCache.key(config, seed, schedule=schedule, kind="batch", replicas=replicas, chunk=chunk)
+    cached: Dict[str, np.ndarray] | None = runs.get(key)
+    if cached is not None:
+        return BatchResult([BatchPartial.from_state({name: column[i] for name, column in cached.items()})
+                            for i in range(len(cached["replicas"]))], quantiles)
+
+    workers = workers or os.cpu_count() or 1
+    seeds: List[int] = replica_seeds(seed, replicas)
+    # Chunks do not depend on the amount of workers, so neither do the results
+    chunks: List[List[int]] = [seeds[i:i + chunk] for i in range(0, replicas, chunk)]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        partials: List[BatchPartial] = list(
+            executor.map(_run_chunk, [config] * len(chunks), chunks, [schedule] * len(chunks)))
+
+    # Stored once for the whole batch, so the cache is checked against its limit once too
+    states: List[Dict[str, np.ndarray]] = [i.state() for i in partials]
+    runs.put(key, {name: np.stack([i[name] for i in states]) for name in states[0]})
+
+    return BatchResult(partials, quantiles)
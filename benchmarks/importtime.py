@@ -0,0 +1,54 @@
+import subprocess
+import sys
+
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Root of the repository, the imports are run from there
+ROOT: Path = Path(__file__).resolve().parent.parent
+
+# Statements to time, the plotting one is what main.py used to import eagerly
+STATEMENTS: Dict[str, str] = {
+    "core": "import simulation",
+    "gui": "import main",
+    "plotting": "import matplotlib.pyplot, matplotlib.backends.backend_tkagg",
+}
+
+
+def importtime(statement: str) -> List[Tuple[int, str]]:
+    '''
+    Run the statement with -X importtime, return cumulative microseconds and name of every module.
+    '''
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                             cwd=ROOT, capture_output=True, text=True, check=True)
+
+    modules: List[Tuple[int, str]] = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # One space separates the column, every further two spaces are one level of nesting
+        modules.append((int(cumulative), name[1:].rstrip()))
+
+    return modules
+
+
+def main(repeat: int = 5) -> None:
+    '''
+    Print the best total import time of every statement and its heaviest modules.
+    '''
+    for label, statement in STATEMENTS.items():
+        runs: List[List[Tuple[int, str]]] = [importtime(statement) for _ in range(repeat)]
+        # Top level modules are the ones without indentation
+        totals: List[int] = [sum(t for t, name in run if not name.startswith(" ")) for run in runs]
+        best: List[Tuple[int, str]] = runs[totals.index(min(totals))]
+
+        plotting: bool = any(name.strip().split(".")[0] == "matplotlib" for _, name in best)
+        print(f"{label}: {statement}")
+        print(f"  total {min(totals) / 1000:.1f} ms, loads matplotlib: {plotting}")
+        for cumulative, name in sorted(best, reverse=True)[:5]:
+            print(f"  {cumulative / 1000:8.1f} ms  {name.strip()}")
+
+
+if __name__ == "__main__":
+    main()
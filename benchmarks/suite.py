@@ -0,0 +1,293 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+# Root of the repository, the simulation modules are imported from there
+ROOT: Path = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from config import Config, ProductParams, load_config  # noqa: E402
+from pooled import PooledSimulation  # noqa: E402
+from simulation import Simulation  # noqa: E402
+
+# Scenarios as active insurances in the book, amount of steps and amount of replicas
+SCENARIOS: Dict[str, Dict[str, int]] = {
+    "small": {"book": 1_000, "steps": 200, "replicas": 5},
+    "medium": {"book": 100_000, "steps": 100, "replicas": 3},
+    "large": {"book": 1_000_000, "steps": 30, "replicas": 1},
+}
+
+# Scenarios timing the pooled engine against the simulation, optionally with one duration for all products
+POOLED: Dict[str, Dict[str, int]] = {
+    # Few insurances, the engines differ only by the fixed cost of a step
+    "pooled-sparse": {"book": 0, "steps": 5_000, "duration": 20, "replicas": 1},
+    # Long-lived insurances sold at a low rate pile up into a large book
+    "pooled-long": {"book": 10_000, "steps": 3_000, "duration": 1_000, "replicas": 1},
+    # Many short-lived insurances
+    "pooled-dense": {"book": 100_000, "steps": 100, "replicas": 1},
+}
+
+# Company methods timed as phases of a step, by the name of the phase
+PHASES: Dict[str, str] = {
+    "taxes": "pay_taxes",
+    "expiry": "stop_insurances",
+    "sales": "sell_insurance",
+    "payout": "payout",
+}
+
+
+def scenario_config(base: Config, book: int, steps: int, duration: int | None = None) -> Config:
+    '''
+    Config of the base products with the demand set so that the book holds about the given amount.
+    '''
+    config: Config = base._replace(until=steps)
+    for name, params in base.products.items():
+        if duration is not None:
+            params = params._replace(until=duration)
+        # Every product sells its share of the book over its duration
+        sales: int = book // (len(base.products) * params.until)
+        # The half keeps the floor division of Company from rounding down
+        demand: float = (sales + 0.5) * params.payout / (params.cost * params.until)
+        config = config.with_product(name, ProductParams.parse(name, list(params._replace(demand=demand))))
+
+    return config
+
+
+def _timed(times: Dict[str, float], counts: Dict[str, int], phase: str, method: Callable) -> Callable:
+    '''
+    Helper function to wrap a company method so that its time adds up to the phase.
+    '''
+    def wrapper(*args: Any) -> Any:
+        start: float = time.perf_counter()
+        result: Any = method(*args)
+        times[phase] += time.perf_counter() - start
+        counts[phase] += 1
+        return result
+
+    return wrapper
+
+
+def _spread(samples: List[float]) -> Dict[str, float]:
+    '''
+    Helper function to sum up the per-step times of the repeats of a phase.
+    '''
+    median: float = float(np.median(samples))
+    # Interquartile range relative to the median, a single slow repeat barely moves it
+    quartiles: np.ndarray = np.percentile(samples, [25, 75])
+    return {"per_step_us": median, "min_us": min(samples), "max_us": max(samples),
+            "spread": float(quartiles[1] - quartiles[0]) / median if median else 0.0}
+
+
+def _simulation_pass(config: Config, replicas: int, seed: int) -> Tuple[Dict[str, float], Dict[str, int], List[int]]:
+    '''
+    Helper function to time the phases and steps of the replicas once.
+    '''
+    times: Dict[str, float] = {i: 0.0 for i in [*PHASES, "step"]}
+    counts: Dict[str, int] = {i: 0 for i in [*PHASES, "step"]}
+    active: List[int] = []
+
+    for replica in range(replicas):
+        simulation = Simulation(config, seed + replica)
+        for phase, method in PHASES.items():
+            setattr(simulation.company, method,
+                    _timed(times, counts, phase, getattr(simulation.company, method)))
+
+        running = True
+        while running:
+            start: float = time.perf_counter()
+            _, running = simulation.step()
+            times["step"] += time.perf_counter() - start
+            counts["step"] += 1
+        active.append(simulation.company.book.active())
+
+    return times, counts, active
+
+
+def run_scenario(config: Config, replicas: int, seed: int = 0, repeat: int = 5) -> Dict[str, Any]:
+    '''
+    Time the phases and steps of the replicas and measure the peak memory of one of them.
+
+    One replica is run first to warm up, then all replicas are timed repeat
+    times. Every phase reports the median time per step over the repeats,
+    along with the smallest, the largest and the spread between the quartiles.
+    '''
+    _simulation_pass(config, 1, seed)
+    samples: Dict[str, List[float]] = {i: [] for i in [*PHASES, "step"]}
+    for _ in range(repeat):
+        times, counts, active = _simulation_pass(config, replicas, seed)
+        for phase, total in times.items():
+            samples[phase].append(total / max(counts["step"], 1) * 1e6)
+
+    # Tracing slows allocations down, so memory is measured on a separate run
+    tracemalloc.start()
+    simulation = Simulation(config, seed)
+    running = True
+    while running:
+        _, running = simulation.step()
+    peak: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "active": int(np.mean(active)),
+        "phases": {phase: {"calls": counts[phase], **_spread(values)} for phase, values in samples.items()},
+        "peak_memory": peak,
+    }
+
+
+def _pooled_pass(config: Config, replicas: int, seed: int) -> Tuple[Dict[str, float], int, List[int]]:
+    '''
+    Helper function to time the steps of the simulation and of the pooled engine once.
+    '''
+    times: Dict[str, float] = {"simulation": 0.0, "pooled": 0.0}
+    steps: int = 0
+    active: List[int] = []
+
+    for replica in range(replicas):
+        engines: Dict[str, Simulation | PooledSimulation] = {
+            "simulation": Simulation(config, seed + replica), "pooled": PooledSimulation(config, seed + replica)}
+        for engine, simulation in engines.items():
+            running = True
+            while running:
+                start: float = time.perf_counter()
+                _, running = simulation.step()
+                times[engine] += time.perf_counter() - start
+        steps += config.until
+        active.append(engines["simulation"].company.book.active())
+
+    return times, steps, active
+
+
+def run_pooled(config: Config, replicas: int, seed: int = 0, repeat: int = 5) -> Dict[str, Any]:
+    '''
+    Time the steps of the simulation and of the pooled engine on the same replicas, repeated as in run_scenario.
+    '''
+    _pooled_pass(config, 1, seed)
+    samples: Dict[str, List[float]] = {"simulation": [], "pooled": []}
+    for _ in range(repeat):
+        times, steps, active = _pooled_pass(config, replicas, seed)
+        for engine, total in times.items():
+            samples[engine].append(total / max(steps, 1) * 1e6)
+
+    # Memory is measured on a separate run of the pooled engine, as in run_scenario
+    tracemalloc.start()
+    PooledSimulation(config, seed).run()
+    peak: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "active": int(np.mean(active)),
+        "phases": {engine: {"calls": steps, **_spread(values)} for engine, values in samples.items()},
+        "peak_memory": peak,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float,
+            floor: float = 5.0) -> List[str]:
+    '''
+    Phases that got slower than the baseline by more than the threshold.
+
+    Phases that take less than the floor in microseconds per step in both runs
+    are at the level of timer noise and are not checked. Medians are compared,
+    and the threshold grows by the larger spread of the repeats of the two
+    runs, so noisy phases need a bigger slowdown to count.
+    '''
+    regressions: List[str] = []
+    for name, scenario in results["scenarios"].items():
+        if name not in baseline["scenarios"]:
+            continue
+        old: Dict[str, Any] = baseline["scenarios"][name]
+        for phase, timing in scenario["phases"].items():
+            previous: Dict[str, float] = old["phases"].get(phase, {})
+            before: float = previous.get("per_step_us", 0)
+            ratio: float = timing["per_step_us"] / before if before else 1.0
+            limit: float = threshold * (1 + max(previous.get("spread", 0.0), timing.get("spread", 0.0)))
+            if max(before, timing["per_step_us"]) < floor:
+                mark: str = "below floor"
+            else:
+                mark = "REGRESSION" if ratio > limit else ""
+                if ratio > limit:
+                    regressions.append(f"{name}/{phase}")
+            print(f"{name:>14} {phase:>10} {before:12.1f} {timing['per_step_us']:12.1f} us "
+                  f"{ratio:6.2f}x of {limit:4.2f}x {mark}")
+
+        ratio = scenario["peak_memory"] / old["peak_memory"] if old.get("peak_memory") else 1.0
+        print(f"{name:>14} {'memory':>10} {old.get('peak_memory', 0):12d} {scenario['peak_memory']:12d} B  "
+              f"{ratio:6.2f}x")
+        if ratio > threshold:
+            regressions.append(f"{name}/memory")
+
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    '''
+    Run the scenarios, save the results and compare them with the baseline.
+    '''
+    parser = argparse.ArgumentParser(description="Benchmark the simulation core.")
+    parser.add_argument("scenarios", nargs="*", default=[*SCENARIOS, *POOLED],
+                        help=f"scenarios to run, of {', '.join([*SCENARIOS, *POOLED])} or custom")
+    parser.add_argument("--config", default=str(ROOT / "config.json"), help="config with the base products")
+    parser.add_argument("--book", type=int, help="active insurances of the custom scenario")
+    parser.add_argument("--steps", type=int, help="steps of the custom scenario")
+    parser.add_argument("--replicas", type=int, default=1, help="replicas of the custom scenario")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first replica")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs of every scenario after a warm-up")
+    parser.add_argument("-o", "--output", help="file to save the results to as JSON")
+    parser.add_argument("-b", "--baseline", help="results to compare with")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio that is a regression")
+    parser.add_argument("--floor", type=float, default=5.0,
+                        help="time per step in microseconds below which phases are not compared")
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error(f"argument --repeat: must be at least 1, got {args.repeat}")
+
+    scenarios: Dict[str, Dict[str, int]] = {i: {**SCENARIOS, **POOLED}[i] for i in args.scenarios
+                                            if i in SCENARIOS or i in POOLED}
+    if args.book is not None and args.steps is not None:
+        scenarios["custom"] = {"book": args.book, "steps": args.steps, "replicas": args.replicas}
+
+    base: Config = load_config(args.config)
+    results: Dict[str, Any] = {
+        "python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+        "scenarios": {},
+    }
+    for name, scenario in scenarios.items():
+        config: Config = scenario_config(base, scenario["book"], scenario["steps"], scenario.get("duration"))
+        if name in POOLED:
+            results["scenarios"][name] = {
+                **scenario, **run_pooled(config, scenario["replicas"], args.seed, args.repeat)}
+            phases = results["scenarios"][name]["phases"]
+            print(f"{name}: {results['scenarios'][name]['active']} active, "
+                  f"{phases['simulation']['per_step_us']:.1f} us per step in the simulation, "
+                  f"{phases['pooled']['per_step_us']:.1f} us in the pooled engine")
+            continue
+
+        results["scenarios"][name] = {
+            **scenario, **run_scenario(config, scenario["replicas"], args.seed, args.repeat)}
+        timing = results["scenarios"][name]["phases"]["step"]
+        print(f"{name}: {results['scenarios'][name]['active']} active, "
+              f"{timing['per_step_us']:.1f} us per step, "
+              f"{results['scenarios'][name]['peak_memory'] / 2 ** 20:.1f} MiB peak")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    if args.baseline:
+        regressions: List[str] = compare(results, json.loads(Path(args.baseline).read_text()),
+                                         args.threshold, args.floor)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}")
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
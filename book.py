@@ -0,0 +1,357 @@
+import numpy as np
+
+from typing import Dict, List, Tuple
+
+
+class PolicyBook:
+    '''
+    Class for the book of active policies, stored column by column.
+
+    Policies are indexed by the step they expire on, so retiring a step costs
+    only the amount of expiring policies. Retired rows are marked dead and
+    the columns are compacted once dead rows outnumber the active ones.
+    '''
+
+    def __init__(self, capacity: int = 1024) -> None:
+        '''
+        Constructor for the policy book.
+        '''
+        # Amount of rows in use, including dead ones
+        self.size: int = 0
+        # Amount of dead rows
+        self.dead: int = 0
+        # Last step the policies were retired on
+        self.retired: int = 0
+        # Row ranges of the policies by the step they expire on
+        self.buckets: Dict[int, List[Tuple[int, int]]] = {}
+        # Type codes of the policies, indices into insurances.TYPES
+        self.types: np.ndarray = np.empty(capacity, dtype=np.int8)
+        # Costs of the policies
+        self.costs: np.ndarray = np.empty(capacity, dtype=np.float64)
+        # Steps on which the policies expire
+        self.expiry: np.ndarray = np.empty(capacity, dtype=np.int64)
+        # Payouts of the policies
+        self.payouts: np.ndarray = np.empty(capacity, dtype=np.float64)
+        # Franchises of the policies
+        self.franchises: np.ndarray = np.empty(capacity, dtype=np.float64)
+        # Whether the row holds an active policy
+        self.alive: np.ndarray = np.empty(capacity, dtype=np.bool_)
+
+    def __len__(self) -> int:
+        return self.size - self.dead
+
+    def __columns(self) -> Tuple[np.ndarray, ...]:
+        '''
+        Helper function to list the columns of the book.
+        '''
+        return (self.types, self.costs, self.expiry, self.payouts, self.franchises, self.alive)
+
+    def __grow(self, needed: int) -> None:
+        '''
+        Enlarge the columns geometrically so that the needed amount of rows fits.
+        '''
+        capacity: int = max(len(self.types), 1)
+        while capacity < needed:
+            capacity *= 2
+
+        self.types, self.costs, self.expiry, self.payouts, self.franchises, self.alive = (
+            np.resize(column, capacity) for column in self.__columns())
+
+    def __compact(self) -> None:
+        '''
+        Drop the dead rows and rebuild the expiry index for the rows that are left.
+        '''
+        keep: np.ndarray = self.alive[:self.size]
+        kept: int = self.size - self.dead
+        for column in self.__columns():
+            column[:kept] = column[:self.size][keep]
+        self.size = kept
+        self.dead = 0
+
+        # Rows of one sale stay adjacent, so the index is rebuilt from runs of equal expiry
+        self.buckets = {}
+        bounds: List[int] = [0, *(np.flatnonzero(np.diff(self.expiry[:kept])) + 1).tolist(), kept]
+        for start, stop in zip(bounds, bounds[1:]):
+            if start < stop:
+                self.buckets.setdefault(int(self.expiry[start]), []).append((start, stop))
+
+    def append(self, code: int, cost: float, expiry: int, payout: float, franchise: float, count: int) -> None:
+        '''
+        Add count identical policies to the book in one go.
+        '''
+        if count <= 0:
+            return
+
+        end: int = self.size + count
+        if end > len(self.types):
+            self.__grow(end)
+
+        self.types[self.size:end] = code
+        self.costs[self.size:end] = cost
+        self.expiry[self.size:end] = expiry
+        self.payouts[self.size:end] = payout
+        self.franchises[self.size:end] = franchise
+        self.alive[self.size:end] = True
+        self.buckets.setdefault(expiry, []).append((self.size, end))
+        self.size = end
+
+    def state(self) -> Dict[str, np.ndarray]:
+        '''
+        Arrays holding the whole state of the book.
+        '''
+        return {
+            "types": self.types[:self.size], "costs": self.costs[:self.size],
+            "expiry": self.expiry[:self.size], "payouts": self.payouts[:self.size],
+            "franchises": self.franchises[:self.size], "alive": self.alive[:self.size],
+            "buckets": np.array([(step, start, stop) for step, ranges in self.buckets.items()
+                                 for start, stop in ranges], dtype=np.int64).reshape(-1, 3),
+            "counters": np.array([self.size, self.dead, self.retired], dtype=np.int64),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, np.ndarray]) -> "PolicyBook":
+        '''
+        Make the book back from its state.
+        '''
+        size, dead, retired = (int(i) for i in state["counters"])
+        book = cls(max(size, 1))
+        book.size, book.dead, book.retired = size, dead, retired
+        for name in ("types", "costs", "expiry", "payouts", "franchises", "alive"):
+            getattr(book, name)[:size] = state[name]
+        for step, start, stop in state["buckets"].tolist():
+            book.buckets.setdefault(step, []).append((start, stop))
+
+        return book
+
+    def remove_expired(self, step: int) -> int:
+        '''
+        Remove the policies that expire on the step or earlier, return the amount removed.
+        '''
+        # Walking every step is cheaper than walking the index unless steps were skipped
+        if step - self.retired <= len(self.buckets):
+            steps: List[int] = [i for i in range(self.retired + 1, step + 1) if i in self.buckets]
+        else:
+            steps = [i for i in self.buckets if i <= step]
+        self.retired = max(self.retired, step)
+
+        removed: int = 0
+        for i in steps:
+            for start, stop in self.buckets.pop(i):
+                self.alive[start:stop] = False
+                removed += stop - start
+        self.dead += removed
+
+        if self.dead * 2 > self.size:
+            self.__compact()
+
+        return removed
+
+    def active(self, code: int | None = None) -> int:
+        '''
+        Amount of active policies, optionally of one type only.
+        '''
+        if code is None:
+            return len(self)
+
+        return int(np.count_nonzero(self.active_types() == code))
+
+    def active_payouts(self) -> np.ndarray:
+        '''
+        Payouts of the active policies.
+        '''
+        if self.dead:
+            return self.payouts[:self.size][self.alive[:self.size]]
+        return self.payouts[:self.size]
+
+    def active_types(self) -> np.ndarray:
+        '''
+        Type codes of the active policies.
+        '''
+        if self.dead:
+            return self.types[:self.size][self.alive[:self.size]]
+        return self.types[:self.size]
+
+
+class CohortBook:
+    '''
+    Class for the book of active policies, stored as cohorts of one sale each.
+
+    All policies of one sale share their type, parameters, start and expiry,
+    so a cohort holds them as a single row with a count. Memory and the cost
+    of a step grow with the amount of sales instead of the amount of policies.
+    '''
+
+    def __init__(self, capacity: int = 64) -> None:
+        '''
+        Constructor for the cohort book.
+        '''
+        # Amount of rows in use, including dead ones
+        self.size: int = 0
+        # Amount of dead rows
+        self.dead: int = 0
+        # Amount of active policies in all cohorts
+        self.policies: int = 0
+        # Last step the cohorts were retired on
+        self.retired: int = 0
+        # Rows of the cohorts by the step they expire on
+        self.buckets: Dict[int, List[int]] = {}
+        # Type codes of the cohorts, indices into insurances.TYPES
+        self.types: np.ndarray = np.empty(capacity, dtype=np.int8)
+        # Costs of the policies of the cohorts
+        self.costs: np.ndarray = np.empty(capacity, dtype=np.float64)
+        # Steps on which the cohorts were sold
+        self.starts: np.ndarray = np.empty(capacity, dtype=np.int64)
+        # Steps on which the cohorts expire
+        self.expiry: np.ndarray = np.empty(capacity, dtype=np.int64)
+        # Payouts of the policies of the cohorts
+        self.payouts: np.ndarray = np.empty(capacity, dtype=np.float64)
+        # Franchises of the policies of the cohorts
+        self.franchises: np.ndarray = np.empty(capacity, dtype=np.float64)
+        # Amount of policies in the cohorts
+        self.counts: np.ndarray = np.empty(capacity, dtype=np.int64)
+        # Whether the row holds an active cohort
+        self.alive: np.ndarray = np.empty(capacity, dtype=np.bool_)
+
+    def __len__(self) -> int:
+        return self.policies
+
+    def __columns(self) -> Tuple[np.ndarray, ...]:
+        '''
+        Helper function to list the columns of the book.
+        '''
+        return (self.types, self.costs, self.starts, self.expiry,
+                self.payouts, self.franchises, self.counts, self.alive)
+
+    def __grow(self) -> None:
+        '''
+        Helper function to double the capacity of the columns.
+        '''
+        capacity: int = 2 * max(len(self.types), 1)
+        (self.types, self.costs, self.starts, self.expiry,
+         self.payouts, self.franchises, self.counts, self.alive) = (
+            np.resize(column, capacity) for column in self.__columns())
+
+    def __compact(self) -> None:
+        '''
+        Drop the dead rows and rebuild the expiry index for the rows that are left.
+        '''
+        keep: np.ndarray = self.alive[:self.size]
+        kept: int = self.size - self.dead
+        for column in self.__columns():
+            column[:kept] = column[:self.size][keep]
+        self.size = kept
+        self.dead = 0
+
+        self.buckets = {}
+        for row, step in enumerate(self.expiry[:kept].tolist()):
+            self.buckets.setdefault(step, []).append(row)
+
+    def append(self, code: int, cost: float, expiry: int, payout: float, franchise: float, count: int,
+               start: int | None = None) -> None:
+        '''
+        Add a cohort of count identical policies to the book, start defaults to the last retired step.
+        '''
+        if count <= 0:
+            return
+
+        if self.size == len(self.types):
+            self.__grow()
+
+        row: int = self.size
+        self.types[row] = code
+        self.costs[row] = cost
+        self.starts[row] = self.retired if start is None else start
+        self.expiry[row] = expiry
+        self.payouts[row] = payout
+        self.franchises[row] = franchise
+        self.counts[row] = count
+        self.alive[row] = True
+        self.buckets.setdefault(expiry, []).append(row)
+        self.size += 1
+        self.policies += count
+
+    def state(self) -> Dict[str, np.ndarray]:
+        '''
+        Arrays holding the whole state of the book.
+        '''
+        return {
+            "types": self.types[:self.size], "costs": self.costs[:self.size],
+            "starts": self.starts[:self.size], "expiry": self.expiry[:self.size],
+            "payouts": self.payouts[:self.size], "franchises": self.franchises[:self.size],
+            "counts": self.counts[:self.size], "alive": self.alive[:self.size],
+            "counters": np.array([self.size, self.dead, self.policies, self.retired], dtype=np.int64),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, np.ndarray]) -> "CohortBook":
+        '''
+        Make the book back from its state.
+        '''
+        size, dead, policies, retired = (int(i) for i in state["counters"])
+        book = cls(max(size, 1))
+        book.size, book.dead, book.policies, book.retired = size, dead, policies, retired
+        for name in ("types", "costs", "starts", "expiry", "payouts", "franchises", "counts", "alive"):
+            getattr(book, name)[:size] = state[name]
+        for row in np.flatnonzero(book.alive[:size]).tolist():
+            book.buckets.setdefault(int(book.expiry[row]), []).append(row)
+
+        return book
+
+    def remove_expired(self, step: int) -> int:
+        '''
+        Remove the cohorts that expire on the step or earlier, return the amount of policies removed.
+        '''
+        if step - self.retired <= len(self.buckets):
+            steps: List[int] = [i for i in range(self.retired + 1, step + 1) if i in self.buckets]
+        else:
+            steps = [i for i in self.buckets if i <= step]
+        self.retired = max(self.retired, step)
+
+        removed: int = 0
+        for i in steps:
+            rows: List[int] = self.buckets.pop(i)
+            self.alive[rows] = False
+            removed += int(self.counts[rows].sum())
+            self.dead += len(rows)
+        self.policies -= removed
+
+        if self.dead * 2 > self.size:
+            self.__compact()
+
+        return removed
+
+    def active(self, code: int | None = None) -> int:
+        '''
+        Amount of active policies, optionally of one type only.
+        '''
+        if code is None:
+            return len(self)
+
+        counts, _, types = self.active_cohorts()
+        return int(counts[types == code].sum())
+
+    def active_cohorts(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        '''
+        Counts, payouts and type codes of the active cohorts.
+        '''
+        columns: Tuple[np.ndarray, ...] = (self.counts[:self.size], self.payouts[:self.size],
+                                           self.types[:self.size])
+        if self.dead:
+            alive: np.ndarray = self.alive[:self.size]
+            columns = tuple(column[alive] for column in columns)
+
+        return columns  # type: ignore
+
+    def active_payouts(self) -> np.ndarray:
+        '''
+        Payouts of the active policies, one per policy.
+        '''
+        counts, payouts, _ = self.active_cohorts()
+        return np.repeat(payouts, counts)
+
+    def active_types(self) -> np.ndarray:
+        '''
+        Type codes of the active policies, one per policy.
+        '''
+        counts, _, types = self.active_cohorts()
+        return np.repeat(types, counts)
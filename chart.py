@@ -0,0 +1,95 @@
+import numpy as np
+
+from typing import Tuple
+from matplotlib.axes import Axes
+from matplotlib.backend_bases import DrawEvent, FigureCanvasBase
+from matplotlib.lines import Line2D
+
+
+class LiveChart:
+    '''
+    Class for a chart of one series that is updated in place.
+
+    The line is drawn with blitting over a cached background, and the whole
+    canvas is only redrawn when the axes limits have to grow. Series longer
+    than the axes are wide in pixels are reduced to the minimum and maximum
+    of every pixel column.
+    '''
+
+    def __init__(self, canvas: FigureCanvasBase, ax: Axes) -> None:
+        '''
+        Constructor for the chart.
+        '''
+        self.canvas: FigureCanvasBase = canvas
+        self.ax: Axes = ax
+        # The only line of the chart, drawn by the chart itself
+        self.line: Line2D = ax.plot([], [], animated=True)[0]
+        # Rendered axes without the line
+        self.background = None
+
+        self.ax.set_xlim(0, 10)
+        self.ax.set_ylim(0, 1)
+        # Background has to be captured again after every full redraw
+        self.canvas.mpl_connect("draw_event", self.__on_draw)
+
+    def __on_draw(self, event: DrawEvent) -> None:
+        '''
+        Capture the background and put the line over it.
+        '''
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)  # type: ignore
+        self.ax.draw_artist(self.line)
+
+    def __downsample(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        Reduce the series to the minimum and maximum of every pixel column.
+        '''
+        columns: int = max(int(self.ax.bbox.width), 1)
+        if len(x) <= 2 * columns:
+            return x, y
+
+        starts: np.ndarray = np.linspace(0, len(x), columns, endpoint=False).astype(np.int64)
+        low: np.ndarray = np.minimum.reduceat(y, starts)
+        high: np.ndarray = np.maximum.reduceat(y, starts)
+
+        return (np.append(np.repeat(x[starts], 2), x[-1]),
+                np.append(np.column_stack((low, high)).ravel(), y[-1]))
+
+    def __fit(self, x: np.ndarray, y: np.ndarray) -> bool:
+        '''
+        Grow the limits so that the series fits, return whether they changed.
+        '''
+        changed: bool = False
+        left, right = self.ax.get_xlim()
+        if x[-1] > right:
+            while x[-1] > right:
+                right *= 2
+            self.ax.set_xlim(left, right)
+            changed = True
+
+        bottom, top = self.ax.get_ylim()
+        low, high = float(y.min()), float(y.max())
+        if low < bottom or high > top:
+            # Leave a margin so the limits do not change on every step
+            margin: float = (max(high, top) - min(low, bottom)) / 4
+            self.ax.set_ylim(min(low, bottom) - margin if low < bottom else bottom,
+                             max(high, top) + margin if high > top else top)
+            changed = True
+
+        return changed
+
+    def update(self, x: np.ndarray, y: np.ndarray) -> None:
+        '''
+        Show the series, redrawing only the axes when the limits stay the same.
+        '''
+        if len(x) == 0:
+            return
+
+        self.line.set_data(*self.__downsample(x, y))
+
+        if self.__fit(x, y) or self.background is None:
+            self.canvas.draw()
+            return
+
+        self.canvas.restore_region(self.background)  # type: ignore
+        self.ax.draw_artist(self.line)
+        self.canvas.blit(self.ax.bbox)
@@ -0,0 +1,115 @@
+import copy
+import io
+import json
+import numpy as np
+
+from pathlib import Path
+from typing import Any, Dict
+from book import CohortBook, PolicyBook
+from config import Config
+from schedule import Schedule
+from simulation import Simulation
+from stats import Statistics
+
+# Version of the snapshot layout
+VERSION: int = 1
+# Random streams of a simulation, by attribute of streams.RandomStreams
+STREAMS = ("sales", "occurrence", "severity")
+
+
+def snapshot(simulation: Simulation) -> bytes:
+    '''
+    Compact binary snapshot of the whole state of the simulation, random streams included.
+    '''
+    company = simulation.company
+    seed = simulation.streams.seed
+    meta: Dict[str, Any] = {
+        "version": VERSION,
+        "config": simulation.config.to_dict(),
+        "until": simulation.until,
+        "time": simulation.time,
+        "cohorts": simulation.cohorts,
+        "history": simulation.stats.history,
+        "schedule": simulation.schedule.to_dict() if simulation.schedule is not None else None,
+        "rescaled": simulation.rescaled,
+        "money": company.money,
+        "step": company.step,
+        "params": {name: list(params) for name, params in company.params.items()},
+        "seed": {"entropy": seed.entropy, "spawn_key": list(seed.spawn_key)},
+        "streams": {i: getattr(simulation.streams, i).bit_generator.state for i in STREAMS},
+    }
+
+    arrays: Dict[str, np.ndarray] = {
+        "meta": np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8),
+        "type_payouts": company.type_payouts,
+        "factors": simulation.factors,
+        "fired": simulation.fired,
+        **{f"book_{name}": array for name, array in company.book.state().items()},
+        **{f"stats_{name}": array for name, array in simulation.stats.state().items()},
+    }
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)  # type: ignore
+
+    return buffer.getvalue()
+
+
+def restore(data: bytes) -> Simulation:
+    '''
+    Make a simulation back from its snapshot, it continues exactly like the original.
+    '''
+    with np.load(io.BytesIO(data)) as archive:
+        arrays: Dict[str, np.ndarray] = {name: archive[name] for name in archive.files}
+    meta: Dict[str, Any] = json.loads(arrays.pop("meta").tobytes())
+    if meta["version"] != VERSION:
+        raise ValueError(f"unsupported snapshot version {meta['version']}")
+
+    seed = np.random.SeedSequence(meta["seed"]["entropy"], spawn_key=tuple(meta["seed"]["spawn_key"]))
+    schedule: Schedule | None = Schedule.from_dict(meta["schedule"]) if meta.get("schedule") else None
+    simulation = Simulation(Config.from_dict(meta["config"]), seed, meta.get("cohorts", False), schedule,
+                            meta.get("history", True))
+    for name, state in meta["streams"].items():
+        getattr(simulation.streams, name).bit_generator.state = state
+    simulation.until = meta["until"]
+    simulation.time = meta["time"]
+    if "factors" in arrays:
+        simulation.factors = arrays["factors"]
+        simulation.fired = arrays["fired"]
+        simulation.rescaled = meta["rescaled"]
+
+    company = simulation.company
+    company.money = meta["money"]
+    company.step = meta["step"]
+    for name, params in meta["params"].items():
+        company.change_insurance_params(name, params)
+    company.type_payouts = arrays["type_payouts"]
+    company.book = (CohortBook if simulation.cohorts else PolicyBook).from_state(
+        {name[len("book_"):]: array for name, array in arrays.items() if name.startswith("book_")})
+    simulation.stats = Statistics.from_state(
+        {name[len("stats_"):]: array for name, array in arrays.items() if name.startswith("stats_")},
+        simulation.until + 1, simulation.stats.history)
+
+    return simulation
+
+
+def save(simulation: Simulation, path: str | Path) -> None:
+    '''
+    Write the snapshot of the simulation to a file.
+    '''
+    Path(path).write_bytes(snapshot(simulation))
+
+
+def load(path: str | Path) -> Simulation:
+    '''
+    Read a simulation back from a snapshot file.
+    '''
+    return restore(Path(path).read_bytes())
+
+
+def fork(simulation: Simulation) -> Simulation:
+    '''
+    Independent in-memory copy of the simulation.
+
+    The copy continues with the same random streams as the original, so two
+    branches differ only by what is changed in them after the fork.
+    '''
+    return copy.deepcopy(simulation)
@@ -0,0 +1,102 @@
+import argparse
+import csv
+import json
+import os
+import sys
+
+from typing import Any, Dict, Iterable, Iterator, List, TextIO
+from batch import replica_seeds
+from config import ConfigError, load_config
+from insurances import TYPES
+from schedule import Schedule, load_schedule
+from simulation import Simulation
+
+
+def records(path: str = "config.json", steps: int | None = None, seed: int | None = None,
+            replicas: int = 1, cohorts: bool = False,
+            schedule: Schedule | None = None) -> Iterator[Dict[str, Any]]:
+    '''
+    Run the replicas one after another and yield a record for every step.
+
+    Records come from the step results alone, so the simulations keep no
+    history and the memory does not grow with the amount of steps.
+    '''
+    config = load_config(path)
+    for replica, replica_seed in enumerate(replica_seeds(seed, replicas)):
+        simulation = Simulation(config, replica_seed, cohorts, schedule, history=False)
+        if steps is not None:
+            simulation.until = steps
+
+        running = True
+        while running:
+            result, running = simulation.step()
+            record: Dict[str, Any] = {"replica": replica, "step": result.step,
+                                      "balance": result.balance, "taxes": result.taxes}
+            record.update((f"{i}_sold", amount) for i, amount in zip(TYPES, result.sold))
+            record.update(premium=result.premium, payout=result.payout,
+                          active=simulation.company.book.active())
+            yield record
+
+
+def write_jsonl(rows: Iterable[Dict[str, Any]], stream: TextIO) -> None:
+    '''
+    Write the records as one JSON object per line.
+    '''
+    for row in rows:
+        stream.write(json.dumps(row) + "\n")
+
+
+def write_csv(rows: Iterable[Dict[str, Any]], stream: TextIO) -> None:
+    '''
+    Write the records as CSV with a header taken from the first record.
+    '''
+    writer: csv.DictWriter | None = None
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(stream, fieldnames=list(row))
+            writer.writeheader()
+        writer.writerow(row)
+
+
+def main(argv: List[str] | None = None) -> None:
+    '''
+    Entry point of the headless simulation.
+    '''
+    parser = argparse.ArgumentParser(description="Run the insurance company simulation without the GUI.")
+    parser.add_argument("config", nargs="?", default="config.json", help="path to the config")
+    parser.add_argument("-n", "--steps", type=int, help="amount of steps, the config value by default")
+    parser.add_argument("-s", "--seed", type=int, help="root seed of the replicas")
+    parser.add_argument("-r", "--replicas", type=int, default=1, help="amount of replicas")
+    parser.add_argument("-c", "--cohorts", action="store_true", help="keep the book as one row per sale")
+    parser.add_argument("--schedule", help="JSON schedule of parameter changes during the run")
+    parser.add_argument("-f", "--format", choices=("jsonl", "csv"), default="jsonl", help="output format")
+    parser.add_argument("-o", "--output", help="output file, stdout by default")
+    args = parser.parse_args(argv)
+    # The simulation only stops on reaching its last step, so it has to have one
+    if args.steps is not None and args.steps < 1:
+        parser.error(f"argument -n/--steps: must be at least 1, got {args.steps}")
+
+    try:
+        load_config(args.config)
+        schedule: Schedule | None = load_schedule(args.schedule) if args.schedule else None
+    except (OSError, ConfigError) as e:
+        parser.error(str(e))
+
+    write = write_jsonl if args.format == "jsonl" else write_csv
+    rows = records(args.config, args.steps, args.seed, args.replicas, args.cohorts, schedule)
+
+    if args.output is None:
+        try:
+            write(rows, sys.stdout)
+            sys.stdout.flush()
+        except BrokenPipeError:
+            # The reader is gone, as with head, the rest is thrown away instead of flushed at exit
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            sys.exit(1)
+    else:
+        with open(args.output, "w", newline="") as stream:
+            write(rows, stream)
+
+
+if __name__ == "__main__":
+    main()
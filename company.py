@@ -1,9 +1,12 @@
-import random
-import json
+import numpy as np
 
 from pathlib import Path
 from typing import Dict, List, Tuple
-from insurances import Car, Home, Life
+from book import CohortBook, PolicyBook
+from claims import ClaimsEngine
+from config import Config, ProductParams, as_config
+from insurances import TYPES, Insurance, product_type
+from streams import RandomStreams
 
 
 class Company:
@@ -11,108 +14,111 @@ class Company:
     Class for company.
     '''
 
-    def __init__(self, money: float, path: str = "config.json",) -> None:
+    def __init__(self, money: float, config: Config | str | Path = "config.json",
+                 streams: RandomStreams | None = None, cohorts: bool = False) -> None:
         '''
-        Constructor for company class.
+        Constructor for company class, cohorts keeps the book as one row per sale.
         '''
+        # Random streams of the sales and claims
+        self.streams: RandomStreams = streams if streams is not None else RandomStreams()
         # Insurances that are currently active
-        self.insurances: List[Life | Car | Home] = []
+        self.book: PolicyBook | CohortBook = CohortBook() if cohorts else PolicyBook()
+        # The current step, insurances sold now expire relative to it
+        self.step: int = 0
+        # Engine drawing the claims of the book
+        self.claims: ClaimsEngine = ClaimsEngine(self.streams.occurrence, self.streams.severity)
+        # Payout of the last step by insurance type
+        self.type_payouts: np.ndarray = np.zeros(len(TYPES))
         # The balance of the company
         self.money: float = money
 
-        # Parsed JSON
-        insurance_params: Dict[str, int | float | List[int | float]] = json.loads(Path(path).read_text())
-        # Life insurance parameters
-        self.life_params: List[int | float] = insurance_params["life"] # type: ignore
-        # Home insurance parameters
-        self.home_params: List[int | float] = insurance_params["home"] # type: ignore
-        # Car insurance parameters
-        self.car_params: List[int | float] = insurance_params["car"] # type: ignore
+        # Insurance parameters by type
+        self.params: Dict[str, ProductParams] = dict(as_config(config).products)
+        # Insurances on sale by type, made once per change of their parameters
+        self.__products: Dict[str, Insurance] = {}
 
-    def set_params(self, path: str = "config.json") -> None: 
+    def set_params(self, config: Config | str | Path = "config.json") -> None:
         '''
-        Set params from json.
+        Set params from the config.
         '''
-        # Parsed JSON
-        insurance_params: Dict[str, int | float | List[int | float]] = json.loads(Path(path).read_text())
-        # Life insurance parameters
-        self.life_params: List[int | float] = insurance_params["life"] # type: ignore
-        # Home insurance parameters
-        self.home_params: List[int | float] = insurance_params["home"] # type: ignore
-        # Car insurance parameters
-        self.car_params: List[int | float] = insurance_params["car"] # type: ignore
+        self.params = dict(as_config(config).products)
+        self.__products = {}
 
         self.sell_insurance("life")
         self.sell_insurance("home")
         self.sell_insurance("car")
 
-    def __sell(self, insurance: Life | Car | Home) -> Tuple[str, float]:
+    def product(self, insurancetype: str) -> Insurance:
         '''
-        Sell an insurance by object.
+        Insurance of the type on sale with the current parameters.
+        '''
+        insurance: Insurance | None = self.__products.get(insurancetype)
+        if insurance is None:
+            insurance = self.__products[insurancetype] = Insurance(
+                product_type(insurancetype), *self.params[insurancetype])
+
+        return insurance
+
+    def __sell(self, insurance: Insurance) -> Tuple[int, float]:
+        '''
+        Sell an insurance by object, return the amount sold and the income.
         '''
-        # Change on current phase of the step
-        change: float = 0
         # Amount of insurances sold on this phase
-        amount = random.randint(0, 5) + int(insurance.demand *
-                                            (insurance.cost * insurance.until) // insurance.payout)
-        for _ in range(amount):
-            change += insurance.cost
-            self.money += insurance.cost
-            self.insurances.append(insurance)
+        amount = int(self.streams.sales.integers(0, 6)) + int(insurance.demand *
+                                                              (insurance.cost * insurance.until) // insurance.payout)
+        # Change on current phase of the step
+        change: float = amount * insurance.cost
+        self.money += change
+        self.book.append(insurance.type.code, insurance.cost, self.step + insurance.until,
+                         insurance.payout, insurance.franchise, amount)
 
-        return (f"{amount} {insurance.type} sold for {change}", change)
+        return (amount, change)
 
-    def sell_insurance(self, insurancetype: str) -> Tuple[str, float]:
+    def sell_insurance(self, insurancetype: str) -> Tuple[int, float]:
         '''
-        Sell an insurance by type.
+        Sell an insurance by type, return the amount sold and the income.
         '''
-        match insurancetype:
-            case "life":
-                return self.__sell(Life(*self.life_params))  # type: ignore
-            case "car":
-                return self.__sell(Car(*self.car_params))  # type: ignore
-            case "home":
-                return self.__sell(Home(*self.home_params))  # type: ignore
+        if insurancetype not in self.params:
+            return (0, 0)
 
-        return ("", 0)
+        return self.__sell(self.product(insurancetype))
 
     def change_insurance_params(self, insurancetype: str, insurance_params: List[int | float]) -> None:
         '''
-        Change insurance params.
+        Change insurance params, raises ConfigError for incorrect ones.
         '''
-        match insurancetype:
-            case "life":
-                self.life_params = insurance_params
-            case "car":
-                self.car_params = insurance_params
-            case "home":
-                self.home_params = insurance_params
+        params: ProductParams = ProductParams.parse(insurancetype, insurance_params)
+        if insurancetype in TYPES:
+            self.params[insurancetype] = params
+            self.__products.pop(insurancetype, None)
 
-    def stop_insurances(self, step: int) -> None:
+    def stop_insurances(self, step: int) -> int:
         '''
-        Stop insurance from.
+        Stop insurances that expire on the step, return how many were stopped.
         '''
-        for i in self.insurances:
-            if step == i.until:
-                self.insurances.remove(i)
+        self.step = step
+        return self.book.remove_expired(step)
 
-    def payout(self) -> Tuple[str, float]:
+    def payout(self) -> float:
         '''
-        Calculate the payout.
+        Calculate and pay the payout.
         '''
         # The payout for those fortunate to buy the insurance
-        payout: float = sum(i.payout * random.randint(1, 100) /
-                            100 for i in self.insurances if random.randint(0, 5) <= 2)
+        if isinstance(self.book, CohortBook):
+            payout, self.type_payouts = self.claims.cohort_payout(*self.book.active_cohorts(), len(TYPES))
+        else:
+            payout, self.type_payouts = self.claims.payout(
+                self.book.active_payouts(), self.book.active_types(), len(TYPES))
         self.money -= payout
 
-        return (f"Payout: {round(payout, 2)}", -1 * payout)
+        return payout
 
-    def pay_taxes(self) -> Tuple[str, float]:
+    def pay_taxes(self) -> float:
         '''
-        Pay the taxes.
+        Pay the taxes, return the amount paid.
         '''
         # Amount of taxes to pay
         taxes: float = self.money * 0.09
         self.money -= taxes
 
-        return (f"Taxes: {round(taxes, 2)}", -1 * taxes)
+        return taxes
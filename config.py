@@ -0,0 +1,150 @@
+import hashlib
+import json
+
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, NamedTuple, Tuple
+from insurances import TYPES
+
+
+class ConfigError(ValueError):
+    '''
+    Error for a config with missing or incorrect values.
+    '''
+
+
+class ProductParams(NamedTuple):
+    '''
+    Parameters of an insurance product, in the order of the config lists.
+    '''
+    cost: float
+    until: int
+    payout: float
+    franchise: float
+    demand: float
+
+    @classmethod
+    def parse(cls, name: str, values: Any) -> "ProductParams":
+        '''
+        Check the values of a product and make the parameters from them.
+        '''
+        if not isinstance(values, (list, tuple)) or len(values) != len(cls._fields):
+            raise ConfigError(f"{name}: expected {len(cls._fields)} values {', '.join(cls._fields)}")
+
+        for field, value in zip(cls._fields, values):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ConfigError(f"{name}: {field} must be a number, got {value!r}")
+            if value < 0:
+                raise ConfigError(f"{name}: {field} must not be negative, got {value}")
+
+        params = cls(*values)
+        if not isinstance(params.until, int) or params.until < 1:
+            raise ConfigError(f"{name}: until must be a positive integer, got {params.until}")
+        if params.payout <= 0:
+            raise ConfigError(f"{name}: payout must be positive, got {params.payout}")
+
+        return params
+
+
+class Config(NamedTuple):
+    '''
+    Parsed and checked simulation config.
+
+    Configs are shared through the cache of load_config, so the products are
+    a read-only mapping and with_product is the way to change them.
+    '''
+    # Amount of steps in the simulation
+    until: int
+    # The balance of the company on start
+    startingmoney: float
+    # Parameters by insurance type, in the order of insurances.TYPES
+    products: Mapping[str, ProductParams]
+
+    @classmethod
+    def of(cls, until: int, startingmoney: float, products: Mapping[str, ProductParams]) -> "Config":
+        '''
+        Make the config with a read-only copy of the products.
+        '''
+        return cls(until, startingmoney, MappingProxyType(dict(products)))
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Read-only mappings cannot be pickled, so the products travel as a plain dict
+        return (Config.of, (self.until, self.startingmoney, dict(self.products)))
+
+    @classmethod
+    def from_dict(cls, data: Any) -> "Config":
+        '''
+        Check the values of a parsed JSON config and make the config from them.
+        '''
+        if not isinstance(data, dict):
+            raise ConfigError("config must be a JSON object")
+
+        missing: List[str] = [i for i in ("until", "startingmoney", *TYPES) if i not in data]
+        if missing:
+            raise ConfigError(f"missing {', '.join(missing)}")
+
+        until: Any = data["until"]
+        if isinstance(until, bool) or not isinstance(until, int) or until < 1:
+            raise ConfigError(f"until must be a positive integer, got {until!r}")
+        startingmoney: Any = data["startingmoney"]
+        if isinstance(startingmoney, bool) or not isinstance(startingmoney, (int, float)):
+            raise ConfigError(f"startingmoney must be a number, got {startingmoney!r}")
+
+        return cls.of(until, startingmoney, {i: ProductParams.parse(i, data[i]) for i in TYPES})
+
+    def to_dict(self) -> Dict[str, Any]:
+        '''
+        The config in the layout of the JSON file.
+        '''
+        return {"until": self.until, "startingmoney": self.startingmoney,
+                **{name: list(params) for name, params in self.products.items()}}
+
+    def digest(self) -> str:
+        '''
+        SHA-256 of the config with its numbers normalized, equal configs have equal digests.
+        '''
+        data: Dict[str, Any] = {
+            "until": int(self.until), "startingmoney": float(self.startingmoney),
+            "products": {name: [float(i) for i in params] for name, params in self.products.items()},
+        }
+
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+    def with_product(self, name: str, params: ProductParams) -> "Config":
+        '''
+        Copy of the config with other parameters of one product.
+        '''
+        return self._replace(products=MappingProxyType({**self.products, name: params}))
+
+
+# Parsed configs by resolved path, along with the modification time they were read at
+_cache: Dict[Path, Tuple[int, Config]] = {}
+
+
+def load_config(path: str | Path = "config.json") -> Config:
+    '''
+    Read and check the config, reusing the parsed one while the file is unchanged.
+    '''
+    resolved: Path = Path(path).resolve()
+    mtime: int = resolved.stat().st_mtime_ns
+
+    cached: Tuple[int, Config] | None = _cache.get(resolved)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    try:
+        data: Any = json.loads(resolved.read_text())
+    except json.JSONDecodeError as e:
+        raise ConfigError(f"{path}: {e}") from e
+
+    config: Config = Config.from_dict(data)
+    _cache[resolved] = (mtime, config)
+
+    return config
+
+
+def as_config(config: Config | str | Path) -> Config:
+    '''
+    Config itself, or the config loaded from the path.
+    '''
+    return config if isinstance(config, Config) else load_config(config)
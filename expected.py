@@ -0,0 +1,113 @@
+import numpy as np
+
+from pathlib import Path
+from typing import List
+from config import Config, ProductParams, as_config
+from insurances import TYPES
+
+# Share of the balance left after the taxes of a step
+KEPT: float = 0.91
+# Mean and variance of the sales noise, uniform from 0 to 5
+SALES_MEAN: float = 2.5
+SALES_VAR: float = 35 / 12
+# Mean and variance of the payout share of one insurance on one step,
+# a claim with probability 1/2 times a severity uniform from 1 to 100 percent
+CLAIM_MEAN: float = 0.5 * 0.505
+CLAIM_VAR: float = 0.5 * 0.33835 - CLAIM_MEAN ** 2
+
+
+class ExpectedResult:
+    '''
+    Class for the exact mean and variance of the simulation per step.
+    '''
+
+    def __init__(self, until: int, startingmoney: float) -> None:
+        '''
+        Constructor for the result, the step 0 entries hold the starting state.
+        '''
+        # The step numbers
+        self.steps: np.ndarray = np.arange(until + 1)
+        # Mean and variance of the balance per step
+        self.money: np.ndarray = np.full(until + 1, float(startingmoney))
+        self.money_var: np.ndarray = np.zeros(until + 1)
+        # Mean and variance of the amount of active insurances per step
+        self.active: np.ndarray = np.zeros(until + 1)
+        self.active_var: np.ndarray = np.zeros(until + 1)
+        # Mean premium income and payouts made so far on every step
+        self.premium: np.ndarray = np.zeros(until + 1)
+        self.payouts: np.ndarray = np.zeros(until + 1)
+
+    @property
+    def std(self) -> np.ndarray:
+        '''
+        Standard deviation of the balance per step.
+        '''
+        return np.sqrt(self.money_var)
+
+
+def expected(config: Config | str | Path = "config.json", steps: int | None = None) -> ExpectedResult:
+    '''
+    Mean and variance of the balance and of the active book on every step, without sampling.
+
+    The balance after step T is linear in the sales noise of every earlier
+    sale and in the claims, so its mean follows the steps directly. Its
+    variance is the variance of the part linear in the sales noise, kept as
+    one coefficient per sale, plus the expected variance of the claims given
+    the sales, which is discounted by the squared tax share on every step.
+    '''
+    config = as_config(config)
+    until: int = config.until if steps is None else steps
+    result = ExpectedResult(until, config.startingmoney)
+
+    params: List[ProductParams] = [config.products[i] for i in TYPES]
+    cost: np.ndarray = np.array([p.cost for p in params], dtype=np.float64)
+    duration: np.ndarray = np.array([p.until for p in params], dtype=np.int64)
+    payout: np.ndarray = np.array([p.payout for p in params], dtype=np.float64)
+    # Mean sales per step, same formula as in Company
+    sales: np.ndarray = SALES_MEAN + np.array(
+        [int(p.demand * (p.cost * p.until) // p.payout) for p in params], dtype=np.float64)
+
+    # Coefficient of the sales noise of every type and sale step in the current balance
+    coefficients: np.ndarray = np.zeros((len(params), until + 1))
+    mean: float = float(config.startingmoney)
+    # Variance of the balance given all sales
+    claims: float = 0.0
+
+    for step in range(1, until + 1):
+        # Insurances sold on this step and the ones before it that are still active
+        alive: np.ndarray = np.minimum(step, duration)
+        active: np.ndarray = alive * sales
+        income: float = float(sales @ cost)
+        paid: float = float(active @ payout) * CLAIM_MEAN
+
+        mean = KEPT * mean + income - paid
+        claims = KEPT ** 2 * claims + CLAIM_VAR * float(active @ payout ** 2)
+        coefficients *= KEPT
+        coefficients[:, step] += cost
+        for code in range(len(params)):
+            coefficients[code, step - alive[code] + 1:step + 1] -= payout[code] * CLAIM_MEAN
+
+        result.money[step] = mean
+        result.money_var[step] = claims + SALES_VAR * float((coefficients ** 2).sum())
+        result.active[step] = active.sum()
+        result.active_var[step] = SALES_VAR * alive.sum()
+        result.premium[step] = result.premium[step - 1] + income
+        result.payouts[step] = result.payouts[step - 1] + paid
+
+    return result
+
+
+def compare_with_simulation(config: Config | str | Path = "config.json", replicas: int = 1000,
+                            seed: int | None = None) -> np.ndarray:
+    '''
+    Z-scores per step of the mean balance of the scalar simulation against the exact mean.
+    '''
+    from batch import run_batch
+
+    config = as_config(config)
+    batch = run_batch(config, replicas, seed)
+    exact: ExpectedResult = expected(config)
+    error: np.ndarray = np.sqrt(exact.money_var / replicas)
+
+    return np.divide(batch.mean - exact.money, error,
+                     out=np.zeros_like(error), where=error > 0)
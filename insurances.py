@@ -1,38 +1,80 @@
-class Life:
-    def __init__(self, cost: float, until: int, payout: float, franchise: float, demand: float) -> None:
-        self.type: str = "life"
-        self.cost: float = cost
-        self.until: int = until
-        self.payout: float = payout
-        self.franchise: float = franchise
-        self.demand: float = demand
+from dataclasses import dataclass
+from typing import Dict, List
 
-    def __str__(self) -> str:
-        return f"{self.type} insurance, {self.cost}, {self.until}, {self.payout}, {self.franchise}"
+# Insurance types by name in the order of registration, the index of a type is its code in the policy book
+TYPES: List[str] = []
+
+
+class ProductType:
+    '''
+    Class for an insurance type, there is a single instance per name.
+    '''
+
+    __slots__ = ("name", "code")
 
-class Car:
-    def __init__(self, cost: float, until: int, payout: float, franchise: float, demand: float) -> None:
-        self.type: str = "car"
-        self.cost: float = cost
-        self.until: int = until
-        self.payout: float = payout
-        self.franchise: float = franchise
-        self.demand: float = demand
+    def __init__(self, name: str, code: int) -> None:
+        '''
+        Constructor for the type, use register to get one.
+        '''
+        # Name of the type as in the config
+        self.name: str = name
+        # Code of the type, index into TYPES
+        self.code: int = code
+
+    def __repr__(self) -> str:
+        return f"ProductType({self.name!r}, {self.code})"
 
     def __str__(self) -> str:
-        return f"{self.type} insurance, {self.cost}, {self.until}, {self.payout}, {self.franchise}"
+        return self.name
+
+    def __reduce__(self) -> tuple:
+        # Copies and pickles resolve to the registered instance
+        return (register, (self.name,))
+
+
+# Registered types by name
+_registry: Dict[str, ProductType] = {}
 
 
-class Home:
-    def __init__(self, cost: float, until: int, payout: float, franchise: float, demand: float) -> None:
-        self.type: str = "home"
-        self.cost: float = cost
-        self.until: int = until
-        self.payout: float = payout
-        self.franchise: float = franchise
-        self.demand: float = demand
+def register(name: str) -> ProductType:
+    '''
+    Register an insurance type by name, or get it if it is already registered.
+
+    Configs have to list the parameters of every registered type, so new types
+    should be registered before any config is loaded.
+    '''
+    product: ProductType | None = _registry.get(name)
+    if product is None:
+        product = _registry[name] = ProductType(name, len(TYPES))
+        TYPES.append(name)
+
+    return product
+
+
+def product_type(name: str) -> ProductType:
+    '''
+    Registered insurance type by name, raises KeyError for unknown ones.
+    '''
+    return _registry[name]
+
+
+LIFE: ProductType = register("life")
+CAR: ProductType = register("car")
+HOME: ProductType = register("home")
+
+
+@dataclass(frozen=True, slots=True)
+class Insurance:
+    '''
+    Class for the immutable spec of an insurance on sale.
+    '''
+
+    type: ProductType
+    cost: float
+    until: int
+    payout: float
+    franchise: float
+    demand: float
 
     def __str__(self) -> str:
         return f"{self.type} insurance, {self.cost}, {self.until}, {self.payout}, {self.franchise}"
-
-        
\ No newline at end of file
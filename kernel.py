@@ -0,0 +1,137 @@
+import numpy as np
+
+from pathlib import Path
+from claims import severity_sum
+from config import Config, as_config
+from insurances import TYPES
+from schedule import FIELDS, CompiledSchedule, Schedule
+from streams import RandomStreams
+
+
+class KernelResult:
+    '''
+    Class for the paths of all replicas advanced by the kernel.
+    '''
+
+    def __init__(self, replicas: int, until: int, startingmoney: float) -> None:
+        '''
+        Constructor for the result, the step 0 column holds the starting state.
+        '''
+        # Balance per replica and step
+        self.money: np.ndarray = np.empty((replicas, until + 1))
+        self.money[:, 0] = startingmoney
+        # Active insurances per replica and step
+        self.active: np.ndarray = np.zeros((replicas, until + 1), dtype=np.int64)
+        # Insurances sold per replica and type over the whole run
+        self.sold: np.ndarray = np.zeros((replicas, len(TYPES)), dtype=np.int64)
+        # Payouts per replica over the whole run
+        self.payouts: np.ndarray = np.zeros(replicas)
+
+
+class Kernel:
+    '''
+    Class for advancing many replicas of the simulation at once as arrays.
+
+    The active insurances of every replica are counted per type and sale step
+    in a ring as long as the longest duration, so every phase of a step is one
+    array operation over all replicas.
+    '''
+
+    def __init__(self, config: Config | str | Path = "config.json", replicas: int = 10000,
+                 seed: int | None = None, schedule: Schedule | None = None) -> None:
+        '''
+        Constructor for the kernel, takes a config or a path to it and an optional schedule of changes.
+        '''
+        config = as_config(config)
+        self.until: int = config.until
+        self.startingmoney: float = config.startingmoney
+        self.replicas: int = replicas
+        # Random streams, drawn from by the same components as in the simulation
+        self.streams: RandomStreams = RandomStreams(seed)
+        # Parameters per step, type and field, the types in the order of insurances.TYPES
+        self.schedule: CompiledSchedule = (schedule or Schedule()).compile(config)
+
+    def run(self) -> KernelResult:
+        '''
+        Advance all replicas to the end of the simulation.
+        '''
+        result = KernelResult(self.replicas, self.until, self.startingmoney)
+        schedule: CompiledSchedule = self.schedule
+        cost, until, payout, demand = (FIELDS.index(i) for i in ("cost", "until", "payout", "demand"))
+        window: int = schedule.window
+
+        money: np.ndarray = result.money[:, 0].copy()
+        # Active insurances per replica, type and sale step modulo the window
+        counts: np.ndarray = np.zeros((self.replicas, len(TYPES), window), dtype=np.int64)
+        # Sale step and duration of every slot of the window
+        starts: np.ndarray = np.zeros(window, dtype=np.int64)
+        durations: np.ndarray = np.ones((len(TYPES), window), dtype=np.int64)
+        # Payout of the insurances in every slot, only kept when payouts change during the run
+        payouts: np.ndarray | None = (None if schedule.uniform_payout
+                                      else np.zeros((self.replicas, len(TYPES), window)))
+        # Factors of the fired rules per replica, type and field, and whether every rule has fired
+        factors: np.ndarray = np.ones((self.replicas, len(TYPES), len(FIELDS)))
+        fired: np.ndarray = np.zeros((self.replicas, len(schedule.rule_below)), dtype=np.bool_)
+
+        for step in range(1, self.until + 1):
+            params: np.ndarray = schedule.at(step) * factors
+
+            # Paying taxes
+            money -= money * 0.09
+
+            # Stopping insurances that have lasted their duration
+            counts[:, step - starts >= durations] = 0
+
+            # Selling new insurances, the part that does not depend on the noise as in Company
+            slot: int = step % window
+            fixed: np.ndarray = np.floor_divide(
+                params[:, :, demand] * (params[:, :, cost] * params[:, :, until]), params[:, :, payout])
+            sold: np.ndarray = (self.streams.sales.integers(0, 6, size=(self.replicas, len(TYPES)))
+                                + fixed.astype(np.int64))
+            counts[:, :, slot] = sold
+            starts[slot] = step
+            durations[:, slot] = schedule.at(step)[:, until]
+            money += (sold * params[:, :, cost]).sum(axis=1)
+            result.sold += sold
+
+            # Paying out, every active insurance claims with probability 1/2
+            if payouts is None:
+                active: np.ndarray = counts.sum(axis=2)
+                claimants: np.ndarray = self.streams.occurrence.binomial(active, 0.5)
+                payout_sum: np.ndarray = (severity_sum(self.streams.severity, claimants) / 100
+                                          * params[:, :, payout]).sum(axis=1)
+            else:
+                payouts[:, :, slot] = params[:, :, payout]
+                active = counts.sum(axis=2)
+                claimants = self.streams.occurrence.binomial(counts, 0.5)
+                payout_sum = (severity_sum(self.streams.severity, claimants) / 100 * payouts).sum(axis=(1, 2))
+            money -= payout_sum
+            result.payouts += payout_sum
+
+            result.money[:, step] = money
+            result.active[:, step] = active.sum(axis=1)
+
+            # Rules that fire on the step change the params from the next step on
+            if fired.size:
+                schedule.scale(factors, schedule.fire(result.money[:, step - 1], money, fired))
+
+        return result
+
+
+def compare_with_simulation(config: Config | str | Path = "config.json", replicas: int = 1000,
+                            seed: int | None = None, schedule: Schedule | None = None) -> np.ndarray:
+    '''
+    Z-scores per step of the mean balance of the kernel against the scalar simulation.
+
+    Both engines draw from the same distributions, so for a fixed seed the
+    scores are reproducible and should stay within a few units.
+    '''
+    from batch import run_batch
+
+    config = as_config(config)
+    batch = run_batch(config, replicas, seed, schedule=schedule)
+    money: np.ndarray = Kernel(config, replicas, seed, schedule).run().money
+    error: np.ndarray = np.sqrt((batch.std ** 2 + money.var(axis=0)) / replicas)
+
+    return np.divide(money.mean(axis=0) - batch.mean, error,
+                     out=np.zeros_like(error), where=error > 0)
@@ -1,16 +1,22 @@
 import json
 from pathlib import Path
-from typing import Dict, List
-import matplotlib.pyplot as plt
+from typing import TYPE_CHECKING, Dict, List
+import tkinter.filedialog as tkfd
 import tkinter.messagebox as tkmb
 import tkinter as tk
+import threading
 import sys
 
 
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from insurances import Car, Home, Life
+from config import Config, ConfigError, load_config
+from insurances import TYPES, Insurance
+from profiling import PhaseProfiler
 
-from simulation import Simulation
+from simulation import Simulation, StepResult
+from worker import SimulationWorker
+
+if TYPE_CHECKING:
+    from chart import LiveChart
 
 
 class App():
@@ -28,16 +34,12 @@ class App():
 
         self.__show_settings_popup(path)
 
-        # Creating plt widget
-        self.fig = plt.figure()
-
-        self.ax = plt.gca()
-        self.ax.set_xlabel("Time")
-        self.ax.set_ylabel("Money")
-
-        self.canvas = FigureCanvasTkAgg(self.fig, master=self.window)
-        self.canvas.get_tk_widget().grid(row=0, column=0, rowspan=3)
-        self.canvas.draw()
+        # Creating placeholder for the chart, matplotlib is loaded once the window is up
+        self.f_chart = tk.Frame(self.window, width=640, height=480)
+        self.f_chart.grid(row=0, column=0, rowspan=3)
+        # Chart of the balance, updated in place on every step
+        self.chart: LiveChart | None = None
+        self.window.after_idle(self.__create_chart)
 
         # Creating button for simulation step
         self.b_step = tk.Button(self.window, text="Step",
@@ -62,53 +64,187 @@ class App():
         # self.t_scores.config(state=tk.DISABLED)
         self.t_scores.grid(row=3, column=1)
 
+        # Creating button for running the simulation to the end
+        self.b_run = tk.Button(self.window, text="Run to end",
+                               command=self.__run, width=13, height=3)
+        self.b_run.grid(row=0, column=2)
+
+        # Creating slider for the refresh rate while running
+        self.s_refresh = tk.Scale(self.window, label="Refresh, ms", from_=20, to=1000,
+                                  resolution=10, orient=tk.HORIZONTAL)
+        self.s_refresh.set(100)
+        self.s_refresh.grid(row=1, column=2)
+
+        # Creating button for the profile of the step phases
+        self.b_profile = tk.Button(self.window, text="Profile", command=self.__profile)
+        self.b_profile.grid(row=2, column=2)
+        # Profiler of the step phases, attached to the simulation on the first use
+        self.profiler: PhaseProfiler | None = None
+
+        # Lock for the simulation, the worker steps it on another thread
+        self.lock = threading.Lock()
+        # Background worker while running to the end
+        self.worker: SimulationWorker | None = None
+
         # Binding exit function to close window signal
         self.window.protocol("WM_DELETE_WINDOW", self.__close)
 
         # Simulation
-        self.simulation = Simulation()
+        self.simulation = Simulation(path)
 
         # Main loop of the application
         self.window.mainloop()
 
+    def __create_chart(self) -> "LiveChart":
+        '''
+        Create the chart in place of the placeholder on first use.
+        '''
+        if self.chart is not None:
+            return self.chart
+
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+        from chart import LiveChart
+
+        # Creating plt widget
+        self.fig = Figure()
+
+        self.ax = self.fig.add_subplot()
+        self.ax.set_xlabel("Time")
+        self.ax.set_ylabel("Money")
+
+        self.f_chart.destroy()
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.window)
+        self.canvas.get_tk_widget().grid(row=0, column=0, rowspan=3)
+        self.chart = LiveChart(self.canvas, self.ax)
+        self.canvas.draw()
+
+        return self.chart
+
     def __step(self) -> None:
         '''
         Advance the simulation.
         '''
-        text, last = self.simulation.step()
+        with self.lock:
+            result, last = self.simulation.step()
+            self.__show([result], last)
+
+    def __run(self) -> None:
+        '''
+        Start, pause or resume running the simulation to the end.
+        '''
+        if self.worker is None:
+            # A finished simulation would never reach its end again
+            if self.simulation.stats.step >= self.simulation.until:
+                return
+            self.worker = SimulationWorker(self.simulation, self.s_refresh.get() / 1000, self.lock)
+            self.worker.start()
+            self.b_step["state"] = "disabled"
+            self.b_run["text"] = "Pause"
+            self.window.after(self.s_refresh.get(), self.__poll)
+        elif self.worker.paused:
+            self.worker.resume()
+            self.b_run["text"] = "Pause"
+        else:
+            self.worker.pause()
+            self.b_run["text"] = "Resume"
+
+    def __poll(self) -> None:
+        '''
+        Show the results the worker has made since the last poll.
+        '''
+        if self.worker is None:
+            return
+
+        results: List[StepResult] = []
+        running: bool = True
+        while not self.worker.results.empty():
+            batch, running = self.worker.results.get_nowait()
+            results += batch
 
+        if results or not running:
+            with self.lock:
+                self.__show(results, running)
+
+        if not running:
+            self.worker = None
+        else:
+            self.worker.interval = self.s_refresh.get() / 1000
+            self.window.after(self.s_refresh.get(), self.__poll)
+
+    def __show(self, results: List[StepResult], last: bool) -> None:
+        '''
+        Show the results of the steps, last is false after the final step.
+        '''
         self.l_expired.delete(0, tk.END)
 
-        self.l_expired.insert(tk.END, Life(*self.simulation.company.life_params))  # type: ignore
-        self.l_expired.insert(tk.END, Home(*self.simulation.company.home_params))  # type: ignore
-        self.l_expired.insert(tk.END, Car(*self.simulation.company.car_params))  # type: ignore
+        self.l_expired.insert(tk.END, *(self.simulation.company.product(i) for i in TYPES))
 
-        self.ax.plot(list(i for i, _ in self.simulation.stats.money),
-                     list(i for _, i in self.simulation.stats.money))
-        self.canvas.draw()
+        self.__create_chart().update(self.simulation.stats.steps, self.simulation.stats.balance)
 
-        self.l_logs.insert(tk.END, text)
+        self.l_logs.insert(tk.END, *(i.text for i in results))
 
         self.t_scores.delete(0.0, tk.END)
 
         if not last:
             self.b_step["state"] = "disabled"
+            self.b_run["state"] = "disabled"
             self.t_scores.insert(
-            0.0, f"The end.\nMoney: {round(self.simulation.stats.money[-1][1], 2)}\nLife sold: {self.simulation.stats.sold[-1][0]}\nCar sold: {self.simulation.stats.sold[-1][1]}\nHome sold: {self.simulation.stats.sold[-1][2]}\nPayouts: {round(self.simulation.stats.payouts[-1], 2)}\nActive: {len(self.simulation.company.insurances)}")
+            0.0, f"The end.\nMoney: {round(self.simulation.stats.balance[-1], 2)}\nLife sold: {self.simulation.stats.sold[-1][0]}\nCar sold: {self.simulation.stats.sold[-1][1]}\nHome sold: {self.simulation.stats.sold[-1][2]}\nPayouts: {round(self.simulation.stats.payouts[-1], 2)}\nActive: {self.simulation.company.book.active()}")
         else:
             self.t_scores.insert(
-            0.0, f"Step: {self.simulation.stats.step}\nMoney: {round(self.simulation.stats.money[-1][1], 2)}\nLife sold: {self.simulation.stats.sold[-1][0]}\nCar sold: {self.simulation.stats.sold[-1][1]}\nHome sold: {self.simulation.stats.sold[-1][2]}\nPayouts: {round(self.simulation.stats.payouts[-1], 2)}\nActive: {len(self.simulation.company.insurances)}")
+            0.0, f"Step: {self.simulation.stats.step}\nMoney: {round(self.simulation.stats.balance[-1], 2)}\nLife sold: {self.simulation.stats.sold[-1][0]}\nCar sold: {self.simulation.stats.sold[-1][1]}\nHome sold: {self.simulation.stats.sold[-1][2]}\nPayouts: {round(self.simulation.stats.payouts[-1], 2)}\nActive: {self.simulation.company.book.active()}")
+
+    def __profile(self) -> None:
+        '''
+        Attaching the profiler and showing the time spent in every phase of the steps.
+        '''
+        with self.lock:
+            if self.profiler is None:
+                self.profiler = PhaseProfiler()
+            if self.profiler not in self.simulation.hooks:
+                self.simulation.hooks.append(self.profiler)
+        profiler: PhaseProfiler = self.profiler
+
+        pop = tk.Toplevel(self.window)
+        pop.title("Profile of the steps")
+        t_profile = tk.Text(pop, width=61, height=12, font="TkFixedFont")
+        t_profile.grid(row=0, column=0, columnspan=2)
+
+        def refresh() -> None:
+            with self.lock:
+                summary: str = profiler.summary()
+            t_profile.delete(1.0, tk.END)
+            t_profile.insert(1.0, summary if profiler.records else "Make a step to record its phases.")
+
+        def export() -> None:
+            path: str = tkfd.asksaveasfilename(parent=pop, defaultextension=".json",
+                                               filetypes=[("Trace", "*.json")])
+            if path:
+                with self.lock:
+                    profiler.export(path)
+
+        refresh()
+        b_refresh = tk.Button(pop, text="Refresh", command=refresh)
+        b_refresh.grid(row=1, column=0)
+        b_export = tk.Button(pop, text="Export trace", command=export)
+        b_export.grid(row=1, column=1)
 
     def __close_modal(self, insurancetype: str, insurance_params: List[int | float]) -> None:
         '''
         Closing modal window and making changes.
         '''
-        self.simulation.company.change_insurance_params(
-            insurancetype=insurancetype, insurance_params=insurance_params)
+        try:
+            with self.lock:
+                self.simulation.company.change_insurance_params(
+                    insurancetype=insurancetype, insurance_params=insurance_params)
+        except ConfigError as e:
+            tkmb.showerror("Error", f"Incorrect input!\n{e}")
+            return
         self.pop.grab_release()
         self.pop.destroy()
 
-    def __modal(self, insurance: Life | Car | Home) -> None:
+    def __modal(self, insurance: Insurance) -> None:
         '''
         Creating a popup modal window to configure parameters of the selected insurance.
         '''
@@ -158,7 +294,7 @@ class App():
 
         # Create a button for accept
         # Using lambda for binding reasons
-        b_accept = tk.Button(self.pop, text="Accept", command=lambda: self.__close_modal(insurance.type, [float(t_cost.get(1.0, tk.END)), int(
+        b_accept = tk.Button(self.pop, text="Accept", command=lambda: self.__close_modal(insurance.type.name, [float(t_cost.get(1.0, tk.END)), int(
             t_duration.get(1.0, tk.END)), float(t_payout.get(1.0, tk.END)), float(t_franchise.get(1.0, tk.END)), insurance.demand]))
 
         b_accept.grid(row=4, column=0)
@@ -173,13 +309,7 @@ class App():
         '''
         try:
             selection = self.l_expired.curselection()[0]                    
-            match selection:
-                case 0:
-                    self.__modal(Life(*self.simulation.company.life_params))  # type: ignore
-                case 1:
-                    self.__modal(Home(*self.simulation.company.home_params))  # type: ignore
-                case 2:
-                    self.__modal(Car(*self.simulation.company.car_params))  # type: ignore
+            self.__modal(self.simulation.company.product(TYPES[selection]))
         except:
             pass
 
@@ -187,8 +317,11 @@ class App():
         '''
         Creating a popup modal window to configure parameters of the simulation.
         '''
-        config: Dict[str, int | float | List[int | float]
-                     ] = json.loads(Path(path).read_text())
+        try:
+            config: Config = load_config(path)
+        except (OSError, ConfigError) as e:
+            tkmb.showerror("Error", f"Incorrect config!\n{e}")
+            self.__close()
 
         # Creating a popup window
         self.pop: tk.Toplevel = tk.Toplevel(self.window)
@@ -204,7 +337,7 @@ class App():
 
         # Create a textbox for game duration
         t_game_duration = tk.Text(self.pop, height=1, width=10)
-        t_game_duration.insert(1.0, f"{config['until']}")
+        t_game_duration.insert(1.0, f"{config.until}")
         t_game_duration.grid(row=1, column=0)
 
         # Create a label for starting money
@@ -213,7 +346,7 @@ class App():
 
         # Create a textbox for starting money
         t_startmoney = tk.Text(self.pop, height=1, width=10)
-        t_startmoney.insert(1.0, f"{config['startingmoney']}")
+        t_startmoney.insert(1.0, f"{config.startingmoney}")
         t_startmoney.grid(row=1, column=1)
 
 
@@ -227,7 +360,7 @@ class App():
 
         # Create a textbox for life insurance duration
         t_life_duration = tk.Text(self.pop, height=1, width=10)
-        t_life_duration.insert(1.0, f"{config['life'][1]}")  # type: ignore
+        t_life_duration.insert(1.0, f"{config.products['life'].until}")
         t_life_duration.grid(row=3, column=0)
 
         # Create a label for life insurance cost
@@ -236,7 +369,7 @@ class App():
 
         # Create a textbox for life insurance cost
         t_life_cost = tk.Text(self.pop, height=1, width=10)
-        t_life_cost.insert(1.0, f"{config['life'][0]}")  # type: ignore
+        t_life_cost.insert(1.0, f"{config.products['life'].cost}")
         t_life_cost.grid(row=5, column=0)
 
         # Create a label for life insurance payout
@@ -245,7 +378,7 @@ class App():
 
         # Create a textbox for life insurance payout
         t_life_payout = tk.Text(self.pop, height=1, width=10)
-        t_life_payout.insert(1.0, f"{config['life'][2]}")  # type: ignore
+        t_life_payout.insert(1.0, f"{config.products['life'].payout}")
         t_life_payout.grid(row=7, column=0)
 
         # Create a label for life insurance franchise
@@ -254,7 +387,7 @@ class App():
 
         # Create a textbox for life insurance franchise
         t_life_franchise = tk.Text(self.pop, height=1, width=10)
-        t_life_franchise.insert(1.0, f"{config['life'][3]}")  # type: ignore
+        t_life_franchise.insert(1.0, f"{config.products['life'].franchise}")
         t_life_franchise.grid(row=9, column=0)
 
         # Create a label for life insurance demand
@@ -263,7 +396,7 @@ class App():
 
         # Create a textbox for life insurance franchise
         t_life_demand = tk.Text(self.pop, height=1, width=10)
-        t_life_demand.insert(1.0, f"{config['life'][4]}")  # type: ignore
+        t_life_demand.insert(1.0, f"{config.products['life'].demand}")
         t_life_demand.grid(row=11, column=0)
 
 
@@ -277,7 +410,7 @@ class App():
 
         # Create a textbox for car insurance duration
         t_car_duration = tk.Text(self.pop, height=1, width=10)
-        t_car_duration.insert(1.0, f"{config['car'][1]}")  # type: ignore
+        t_car_duration.insert(1.0, f"{config.products['car'].until}")
         t_car_duration.grid(row=3, column=1)
 
         # Create a label for car insurance cost
@@ -286,7 +419,7 @@ class App():
 
         # Create a textbox for car insurance cost
         t_car_cost = tk.Text(self.pop, height=1, width=10)
-        t_car_cost.insert(1.0, f"{config['car'][0]}")  # type: ignore
+        t_car_cost.insert(1.0, f"{config.products['car'].cost}")
         t_car_cost.grid(row=5, column=1)
 
         # Create a label for car insurance payout
@@ -295,7 +428,7 @@ class App():
 
         # Create a textbox for car insurance payout
         t_car_payout = tk.Text(self.pop, height=1, width=10)
-        t_car_payout.insert(1.0, f"{config['car'][2]}")  # type: ignore
+        t_car_payout.insert(1.0, f"{config.products['car'].payout}")
         t_car_payout.grid(row=7, column=1)
 
         # Create a label for car insurance franchise
@@ -304,7 +437,7 @@ class App():
 
         # Create a textbox for car insurance franchise
         t_car_franchise = tk.Text(self.pop, height=1, width=10)
-        t_car_franchise.insert(1.0, f"{config['car'][3]}")  # type: ignore
+        t_car_franchise.insert(1.0, f"{config.products['car'].franchise}")
         t_car_franchise.grid(row=9, column=1)
 
         # Create a label for car insurance demand
@@ -313,7 +446,7 @@ class App():
 
         # Create a textbox for car insurance franchise
         t_car_demand = tk.Text(self.pop, height=1, width=10)
-        t_car_demand.insert(1.0, f"{config['car'][4]}")  # type: ignore
+        t_car_demand.insert(1.0, f"{config.products['car'].demand}")
         t_car_demand.grid(row=11, column=1)
 
 
@@ -327,7 +460,7 @@ class App():
 
         # Create a textbox for home insurance duration
         t_home_duration = tk.Text(self.pop, height=1, width=10)
-        t_home_duration.insert(1.0, f"{config['home'][1]}")  # type: ignore
+        t_home_duration.insert(1.0, f"{config.products['home'].until}")
         t_home_duration.grid(row=3, column=2)
 
         # Create a label for home insurance cost
@@ -336,7 +469,7 @@ class App():
 
         # Create a textbox for home insurance cost
         t_home_cost = tk.Text(self.pop, height=1, width=10)
-        t_home_cost.insert(1.0, f"{config['home'][0]}")  # type: ignore
+        t_home_cost.insert(1.0, f"{config.products['home'].cost}")
         t_home_cost.grid(row=5, column=2)
 
         # Create a label for home insurance payout
@@ -345,7 +478,7 @@ class App():
 
         # Create a textbox for home insurance payout
         t_home_payout = tk.Text(self.pop, height=1, width=10)
-        t_home_payout.insert(1.0, f"{config['home'][2]}")  # type: ignore
+        t_home_payout.insert(1.0, f"{config.products['home'].payout}")
         t_home_payout.grid(row=7, column=2)
 
         # Create a label for home insurance franchise
@@ -354,7 +487,7 @@ class App():
 
         # Create a textbox for home insurance franchise
         t_home_franchise = tk.Text(self.pop, height=1, width=10)
-        t_home_franchise.insert(1.0, f"{config['home'][3]}")  # type: ignore
+        t_home_franchise.insert(1.0, f"{config.products['home'].franchise}")
         t_home_franchise.grid(row=9, column=2)
 
         # Create a label for home insurance demand
@@ -363,7 +496,7 @@ class App():
 
         # Create a textbox for home insurance franchise
         t_home_demand = tk.Text(self.pop, height=1, width=10)
-        t_home_demand.insert(1.0, f"{config['home'][4]}")  # type: ignore
+        t_home_demand.insert(1.0, f"{config.products['home'].demand}")
         t_home_demand.grid(row=11, column=2)
 
         # Create a button for accept
@@ -386,9 +519,16 @@ class App():
                 self.__close()
 
         def accept() -> None:
-            Path(path).write_text(json.dumps(create_dict(), indent=2))
-            self.simulation.set_params()
-            self.simulation.company.set_params()
+            try:
+                config: Config = Config.from_dict(create_dict())
+            except ConfigError as e:
+                tkmb.showerror("Error", f"Incorrect input!\n{e}")
+                self.pop.grab_set()
+                return
+
+            Path(path).write_text(json.dumps(config.to_dict(), indent=2))
+            self.simulation.set_params(config)
+            self.simulation.company.set_params(config)
             self.pop.destroy()
 
         b_accept = tk.Button(self.pop, text="Accept", command=accept)
@@ -0,0 +1,100 @@
+import json
+import numpy as np
+
+from pathlib import Path
+from typing import Dict, List
+
+
+class PhaseHook:
+    '''
+    Base class for hooks that are called after every phase of a simulation step.
+    '''
+
+    def phase(self, step: int, name: str, start: float, seconds: float, book: int) -> None:
+        '''
+        Called with the step, the phase name, its start by time.perf_counter, its duration and the book size.
+        '''
+
+
+class PhaseProfiler(PhaseHook):
+    '''
+    Class for recording the phases of the steps into a ring buffer.
+
+    Totals per phase are kept for the whole run, while the ring holds only the
+    latest records for the trace.
+    '''
+
+    def __init__(self, capacity: int = 4096) -> None:
+        '''
+        Constructor for the profiler, capacity is the amount of latest records kept.
+        '''
+        # Names of the phases in the order they were first seen
+        self.names: List[str] = []
+        # Index of every phase name
+        self.__index: Dict[str, int] = {}
+        # Amount of records made so far
+        self.records: int = 0
+        # Ring of the latest records
+        self.steps: np.ndarray = np.zeros(capacity, dtype=np.int64)
+        self.phases: np.ndarray = np.zeros(capacity, dtype=np.int16)
+        self.starts: np.ndarray = np.zeros(capacity, dtype=np.float64)
+        self.seconds: np.ndarray = np.zeros(capacity, dtype=np.float64)
+        self.books: np.ndarray = np.zeros(capacity, dtype=np.int64)
+        # Totals per phase over the whole run
+        self.calls: List[int] = []
+        self.total: List[float] = []
+        self.longest: List[float] = []
+
+    def phase(self, step: int, name: str, start: float, seconds: float, book: int) -> None:
+        index: int | None = self.__index.get(name)
+        if index is None:
+            index = self.__index[name] = len(self.names)
+            self.names.append(name)
+            self.calls.append(0)
+            self.total.append(0.0)
+            self.longest.append(0.0)
+
+        self.calls[index] += 1
+        self.total[index] += seconds
+        self.longest[index] = max(self.longest[index], seconds)
+
+        slot: int = self.records % len(self.steps)
+        self.steps[slot] = step
+        self.phases[slot] = index
+        self.starts[slot] = start
+        self.seconds[slot] = seconds
+        self.books[slot] = book
+        self.records += 1
+
+    def __latest(self) -> np.ndarray:
+        '''
+        Slots of the ring from the oldest record to the newest.
+        '''
+        if self.records <= len(self.steps):
+            return np.arange(self.records)
+        return (np.arange(len(self.steps)) + self.records) % len(self.steps)
+
+    def summary(self) -> str:
+        '''
+        Table with the calls, total, mean and longest time and the latest book size per phase.
+        '''
+        latest: np.ndarray = self.__latest()
+        lines: List[str] = [f"{'phase':<12}{'calls':>8}{'total ms':>11}{'mean us':>10}{'max us':>10}{'book':>10}"]
+        for index, name in enumerate(self.names):
+            books: np.ndarray = self.books[latest][self.phases[latest] == index]
+            lines.append(f"{name:<12}{self.calls[index]:>8}{self.total[index] * 1e3:>11.2f}"
+                         f"{self.total[index] / self.calls[index] * 1e6:>10.1f}{self.longest[index] * 1e6:>10.1f}"
+                         f"{int(books[-1]) if len(books) else 0:>10}")
+
+        return "\n".join(lines)
+
+    def export(self, path: str | Path) -> None:
+        '''
+        Write the latest records as a trace in the Chrome trace event format.
+        '''
+        events: List[Dict] = [{
+            "name": self.names[self.phases[i]], "ph": "X", "pid": 0, "tid": 0,
+            "ts": self.starts[i] * 1e6, "dur": self.seconds[i] * 1e6,
+            "args": {"step": int(self.steps[i]), "book": int(self.books[i])},
+        } for i in self.__latest().tolist()]
+        Path(path).write_text(json.dumps({"traceEvents": events}))
@@ -0,0 +1,187 @@
+import functools
+import hashlib
+import io
+import json
+import os
+import numpy as np
+
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+from config import Config
+from schedule import Schedule
+from simulation import Simulation
+from stats import Statistics
+
+# Modules whose code defines the model or the cached aggregates, a change in any of them invalidates the cache
+ENGINE: Tuple[str, ...] = ("simulation.py", "company.py", "book.py", "claims.py", "stats.py", "insurances.py",
+                           "streams.py", "config.py", "schedule.py", "batch.py", "sweep.py")
+# Directory of the default cache, SIMULATION_CACHE overrides it and "off" disables it
+DIRECTORY: Path = Path.home() / ".cache" / "insurance-simulation"
+
+
+@functools.lru_cache(maxsize=None)
+def engine_version() -> str:
+    '''
+    Hash of the code of the engine modules.
+    '''
+    digest = hashlib.sha256()
+    root: Path = Path(__file__).resolve().parent
+    for name in ENGINE:
+        digest.update(name.encode())
+        digest.update((root / name).read_bytes())
+
+    return digest.hexdigest()
+
+
+class RunCache:
+    '''
+    Class for finished runs on disk, addressed by their config, seed, horizon and engine version.
+
+    Every entry is one file of arrays, the statistics of a single run or the
+    aggregates of a whole batch. Reading an entry refreshes its modification
+    time, and the least recently used entries are removed once the cache
+    grows over its limit. Entries are meant to be read and stored by the
+    parent process only, which then checks the limit once per batch.
+    '''
+
+    def __init__(self, directory: str | Path = DIRECTORY, limit: int = 256 * 2 ** 20,
+                 enabled: bool = True) -> None:
+        '''
+        Constructor for the cache, limit is its size in bytes.
+        '''
+        # Directory holding the entries
+        self.directory: Path = Path(directory)
+        # Largest size of all entries together, in bytes
+        self.limit: int = limit
+        # Whether entries are looked up and stored at all
+        self.enabled: bool = enabled
+        # Size of the entries as last measured plus the ones stored since, None until measured
+        self.__size: int | None = None
+
+    @classmethod
+    def default(cls) -> "RunCache":
+        '''
+        Cache in the directory from SIMULATION_CACHE or the default one, disabled by "off".
+        '''
+        setting: str = os.environ.get("SIMULATION_CACHE", "")
+        if setting.lower() in ("off", "0", "false", "no"):
+            return cls(enabled=False)
+
+        return cls(setting or DIRECTORY)
+
+    @staticmethod
+    def resolve(cache: "bool | RunCache") -> "RunCache":
+        '''
+        The cache itself, the default one for True, or a disabled one for False.
+        '''
+        if isinstance(cache, RunCache):
+            return cache
+
+        return RunCache.default() if cache else RunCache(enabled=False)
+
+    @staticmethod
+    def key(config: Config, seed: int | None, steps: int | None = None, cohorts: bool = False,
+            schedule: Schedule | None = None, **extra: Any) -> str:
+        '''
+        Address of a run, the extra fields tell other kinds of entries apart, such as whole batches.
+        '''
+        data = {"config": config.digest(), "seed": seed, "steps": config.until if steps is None else steps,
+                "cohorts": cohorts, "schedule": schedule.digest() if schedule is not None else None,
+                "engine": engine_version(), **extra}
+
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+    def __path(self, key: str) -> Path:
+        '''
+        Helper function to get the file of an entry.
+        '''
+        return self.directory / f"{key}.npz"
+
+    def get(self, key: str) -> Dict[str, np.ndarray] | None:
+        '''
+        Arrays of the entry, or None if it is not cached.
+        '''
+        if not self.enabled:
+            return None
+
+        path: Path = self.__path(key)
+        try:
+            with np.load(path) as archive:
+                arrays: Dict[str, np.ndarray] = {name: archive[name] for name in archive.files}
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        return arrays
+
+    def put(self, key: str, arrays: Dict[str, np.ndarray]) -> None:
+        '''
+        Store the arrays of an entry and evict the old entries over the limit.
+        '''
+        if not self.enabled:
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)  # type: ignore
+        # Written under a unique name first, so readers never see a partial file
+        temporary: Path = self.directory / f"{key}.{os.getpid()}.tmp"
+        temporary.write_bytes(buffer.getvalue())
+        os.replace(temporary, self.__path(key))
+
+        # The directory is listed on the first store only, and again once the entries may have outgrown the limit
+        if self.__size is None:
+            self.evict()
+        else:
+            self.__size += buffer.getbuffer().nbytes
+            if self.__size > self.limit:
+                self.evict()
+
+    def evict(self) -> None:
+        '''
+        Remove the least recently used entries until the cache fits into its limit.
+        '''
+        runs: List[Tuple[float, int, Path]] = []
+        for path in self.directory.glob("*.npz"):
+            try:
+                info = path.stat()
+            except OSError:
+                continue
+            runs.append((info.st_mtime, info.st_size, path))
+
+        size: int = sum(i[1] for i in runs)
+        # Entries are removed down to a part of the limit, so that eviction is not needed on every store
+        for _, length, path in sorted(runs):
+            if size <= self.limit * 0.9:
+                break
+            path.unlink(missing_ok=True)
+            size -= length
+        self.__size = size
+
+    def clear(self) -> None:
+        '''
+        Remove all entries.
+        '''
+        for path in self.directory.glob("*.npz"):
+            path.unlink(missing_ok=True)
+
+    def run(self, config: Config, seed: int, cohorts: bool = False,
+            schedule: Schedule | None = None) -> Statistics:
+        '''
+        Statistics of the run of the config with the seed, from the cache or run to the end.
+        '''
+        key: str = self.key(config, seed, cohorts=cohorts, schedule=schedule)
+        arrays: Dict[str, np.ndarray] | None = self.get(key)
+        if arrays is not None:
+            try:
+                return Statistics.from_state(arrays)
+            except (KeyError, ValueError, IndexError):
+                pass
+
+        simulation = Simulation(config, seed, cohorts, schedule)
+        running = True
+        while running:
+            _, running = simulation.step()
+        self.put(key, simulation.stats.state())
+
+        return simulation.stats
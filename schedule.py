@@ -0,0 +1,193 @@
+import hashlib
+import json
+import numpy as np
+
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Sequence
+from config import Config, ConfigError, ProductParams
+from insurances import TYPES
+
+# Parameters of a product in the order of the last axis of the compiled arrays
+FIELDS: Sequence[str] = ProductParams._fields
+# Parameters a rule may scale, the duration stays an integer so it only changes on schedule
+SCALABLE: Sequence[str] = ("cost", "payout", "franchise", "demand")
+
+
+class Change(NamedTuple):
+    '''
+    Change of some parameters of a product, in effect from the step on.
+    '''
+    step: int
+    product: str
+    values: Dict[str, float]
+
+
+class Rule(NamedTuple):
+    '''
+    Scaling of a parameter of a product by the factor whenever the balance drops below the threshold.
+
+    The rule fires on the step the balance goes from at least the threshold to
+    under it, and the scaled parameter is in effect from the next step. With
+    once it fires only the first time.
+    '''
+    product: str
+    field: str
+    factor: float
+    below: float
+    once: bool = False
+
+
+class CompiledSchedule:
+    '''
+    Class for the schedule turned into per-step arrays for one config.
+    '''
+
+    def __init__(self, params: np.ndarray, rules: Sequence[Rule]) -> None:
+        '''
+        Constructor for the compiled schedule, params holds the parameters per step, type and field.
+        '''
+        # Scheduled parameters in effect on every step, step 0 holds the ones of the config
+        self.params: np.ndarray = params
+        # Whether the scheduled parameters of the step differ from the ones of the step before
+        self.changed: np.ndarray = np.zeros(len(params), dtype=np.bool_)
+        self.changed[1:] = (params[1:] != params[:-1]).any(axis=(1, 2))
+        # Longest duration of any step
+        self.window: int = int(params[:, :, FIELDS.index("until")].max())
+
+        # Rules as arrays of product code, field index, factor, threshold and whether they fire once
+        self.rule_types: np.ndarray = np.array([TYPES.index(i.product) for i in rules], dtype=np.int64)
+        self.rule_fields: np.ndarray = np.array([FIELDS.index(i.field) for i in rules], dtype=np.int64)
+        self.rule_factors: np.ndarray = np.array([i.factor for i in rules], dtype=np.float64)
+        self.rule_below: np.ndarray = np.array([i.below for i in rules], dtype=np.float64)
+        self.rule_once: np.ndarray = np.array([i.once for i in rules], dtype=np.bool_)
+
+        # Whether every insurance of a type pays out the same on every step
+        payout: int = FIELDS.index("payout")
+        self.uniform_payout: bool = bool((params[:, :, payout] == params[:1, :, payout]).all()
+                                         and payout not in self.rule_fields)
+
+    def at(self, step: int) -> np.ndarray:
+        '''
+        Scheduled parameters of the step per type and field, the last ones for steps past the end.
+        '''
+        return self.params[min(step, len(self.params) - 1)]
+
+    def fire(self, previous: np.ndarray, balance: np.ndarray, fired: np.ndarray) -> np.ndarray:
+        '''
+        Rules that fire on a step, one column per rule, for balances given one row per replica.
+
+        Fired holds whether every rule has fired before and is updated in place.
+        '''
+        below: np.ndarray = self.rule_below
+        firing: np.ndarray = ((previous[:, None] >= below) & (balance[:, None] < below)
+                              & ~(self.rule_once & fired))
+        fired |= firing
+
+        return firing
+
+    def scale(self, factors: np.ndarray, firing: np.ndarray) -> None:
+        '''
+        Apply the factors of the firing rules to the factors per replica, type and field in place.
+        '''
+        for rule in np.flatnonzero(firing.any(axis=0)).tolist():
+            factors[firing[:, rule], self.rule_types[rule], self.rule_fields[rule]] *= self.rule_factors[rule]
+
+
+class Schedule:
+    '''
+    Class for a declarative schedule of parameter changes and rules.
+
+    In JSON a schedule looks like {"changes": [{"step": 10, "home": {"cost": 12}}],
+    "rules": [{"product": "home", "field": "cost", "factor": 1.1, "below": 500}]}.
+    Parameters in effect are the scheduled ones times the factors of the rules
+    that have fired so far.
+    '''
+
+    def __init__(self, changes: Sequence[Change] = (), rules: Sequence[Rule] = ()) -> None:
+        '''
+        Constructor for the schedule, raises ConfigError for incorrect changes or rules.
+        '''
+        for change in changes:
+            if isinstance(change.step, bool) or not isinstance(change.step, int) or change.step < 1:
+                raise ConfigError(f"change step must be a positive integer, got {change.step!r}")
+            if change.product not in TYPES:
+                raise ConfigError(f"unknown product {change.product!r}")
+            unknown: List[str] = [i for i in change.values if i not in FIELDS]
+            if unknown:
+                raise ConfigError(f"{change.product}: unknown parameters {', '.join(unknown)}")
+
+        for rule in rules:
+            if rule.product not in TYPES:
+                raise ConfigError(f"unknown product {rule.product!r}")
+            if rule.field not in SCALABLE:
+                raise ConfigError(f"{rule.product}: rules can scale {', '.join(SCALABLE)}, not {rule.field!r}")
+            if isinstance(rule.factor, bool) or not isinstance(rule.factor, (int, float)) or rule.factor <= 0:
+                raise ConfigError(f"{rule.product}: factor must be a positive number, got {rule.factor!r}")
+            if isinstance(rule.below, bool) or not isinstance(rule.below, (int, float)):
+                raise ConfigError(f"{rule.product}: below must be a number, got {rule.below!r}")
+
+        # Changes in the order of their steps, changes of one step in the given order
+        self.changes: List[Change] = sorted(changes, key=lambda change: change.step)
+        self.rules: List[Rule] = list(rules)
+
+    @classmethod
+    def from_dict(cls, data: Any) -> "Schedule":
+        '''
+        Make the schedule from its parsed JSON.
+        '''
+        if not isinstance(data, dict):
+            raise ConfigError("schedule must be a JSON object")
+
+        try:
+            changes: List[Change] = [Change(entry["step"], product, dict(values))
+                                     for entry in data.get("changes", [])
+                                     for product, values in entry.items() if product != "step"]
+            rules: List[Rule] = [Rule(**entry) for entry in data.get("rules", [])]
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            raise ConfigError(f"incorrect schedule: {e}") from e
+
+        return cls(changes, rules)
+
+    def to_dict(self) -> Dict[str, Any]:
+        '''
+        The schedule in the layout of the JSON file.
+        '''
+        return {"changes": [{"step": i.step, i.product: i.values} for i in self.changes],
+                "rules": [i._asdict() for i in self.rules]}
+
+    def digest(self) -> str:
+        '''
+        SHA-256 of the schedule, equal schedules have equal digests.
+        '''
+        return hashlib.sha256(json.dumps(self.to_dict(), sort_keys=True).encode()).hexdigest()
+
+    def compile(self, config: Config, steps: int | None = None) -> CompiledSchedule:
+        '''
+        Parameters of every product on every step up to the end of the config.
+        '''
+        until: int = config.until if steps is None else steps
+        current: Dict[str, ProductParams] = dict(config.products)
+        params: np.ndarray = np.empty((until + 1, len(TYPES), len(FIELDS)))
+
+        changes: List[Change] = self.changes
+        index: int = 0
+        for step in range(until + 1):
+            while index < len(changes) and changes[index].step <= step:
+                change: Change = changes[index]
+                # Checked like the params from the GUI
+                current[change.product] = ProductParams.parse(
+                    change.product, list(current[change.product]._replace(**change.values)))
+                index += 1
+            params[step] = [current[i] for i in TYPES]
+
+        return CompiledSchedule(params, self.rules)
+
+
+def load_schedule(path: str | Path) -> Schedule:
+    '''
+    Read and check the schedule from a JSON file.
+    '''
+    try:
+        return Schedule.from_dict(json.loads(Path(path).read_text()))
+    except json.JSONDecodeError as e:
+        raise ConfigError(f"{path}: {e}") from e
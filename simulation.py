@@ -1,9 +1,59 @@
-from typing import Dict, List, Tuple
+from typing import List, Tuple
 from stats import Statistics
 from company import Company
+from config import Config, as_config
+from insurances import TYPES
+from profiling import PhaseHook
+from schedule import FIELDS, CompiledSchedule, Schedule
+from streams import RandomStreams
 from pathlib import Path
 
-import json
+import numpy as np
+import time
+
+
+class StepResult:
+    '''
+    Class for the outcome of one simulation step.
+    '''
+
+    def __init__(self, step: int, taxes: float, sold: Tuple[int, ...], income: Tuple[float, ...],
+                 payout: float, balance: float) -> None:
+        '''
+        Constructor for the step result.
+        '''
+        # The step number
+        self.step: int = step
+        # Taxes paid on the step
+        self.taxes: float = taxes
+        # Amount of insurances sold per type, in the order of insurances.TYPES
+        self.sold: Tuple[int, ...] = sold
+        # Premium income per type, in the order of insurances.TYPES
+        self.income: Tuple[float, ...] = income
+        # Payout on the step
+        self.payout: float = payout
+        # Balance after the step
+        self.balance: float = balance
+
+    @property
+    def premium(self) -> float:
+        '''
+        Premium income of all types.
+        '''
+        return sum(self.income)
+
+    @property
+    def text(self) -> str:
+        '''
+        Log line of the step, only formatted when asked for.
+        '''
+        sales: str = "; ".join(f"{amount} {i} sold for {change}"
+                               for i, amount, change in zip(TYPES, self.sold, self.income))
+
+        return f"Money: {round(self.balance, 2)}; Taxes: {round(self.taxes, 2)}; {sales}; Payout: {round(self.payout, 2)}"
+
+    def __str__(self) -> str:
+        return self.text
 
 
 class Simulation:
@@ -11,70 +61,135 @@ class Simulation:
     Class for simulation.
     '''
 
-    def __init__(self, path: str = "config.json") -> None:
+    def __init__(self, config: Config | str | Path = "config.json",
+                 seed: int | np.random.SeedSequence | None = None, cohorts: bool = False,
+                 schedule: Schedule | None = None, history: bool = True) -> None:
         '''
-        Simulation class constructor.
+        Simulation class constructor, takes a config or a path to it.
+
+        With cohorts the company keeps one row per sale instead of one per policy.
+        The schedule changes the parameters of the products during the run.
+        Without history the statistics keep only the last steps.
         '''
-        config: Dict[str, int | float | List[int | float]
-                     ] = json.loads(Path(path).read_text())
-        self.until: int = config["until"]  # type: ignore
+        # Random streams of the simulation, all derived from the seed
+        self.streams: RandomStreams = RandomStreams(seed)
+        self.config: Config = as_config(config)
+        self.until: int = self.config.until
         self.time: int = 0
+        # Whether the book of the company is kept as cohorts
+        self.cohorts: bool = cohorts
         self.company: Company = Company(
-            config["startingmoney"], path)  # type: ignore
+            self.config.startingmoney, self.config, self.streams, cohorts)
         self.stats: Statistics = Statistics(
-            config["startingmoney"])  # type: ignore
+            self.config.startingmoney, self.until + 1, history)
+        # Hooks called after every phase of a step, steps are not timed while there are none
+        self.hooks: List[PhaseHook] = []
+        # Schedule of parameter changes, compiled for the config
+        self.schedule: Schedule | None = schedule
+        self.__compile()
 
-    def set_params(self, path: str = "config.json") -> None:
+    def set_params(self, config: Config | str | Path = "config.json") -> None:
         '''
-        Set parameters from json.
+        Set parameters from the config or a path to it.
         '''
-        config: Dict[str, int | float | List[int | float]
-                     ] = json.loads(Path(path).read_text())
-        self.until: int = config["until"]  # type: ignore
-        self.time: int = 0
-        self.company: Company = Company(
-            config["startingmoney"], path)  # type: ignore
-        self.stats: Statistics = Statistics(
-            config["startingmoney"])  # type: ignore
+        self.config = as_config(config)
+        self.until = self.config.until
+        self.time = 0
+        self.company = Company(
+            self.config.startingmoney, self.config, self.streams, self.cohorts)
+        self.stats = Statistics(
+            self.config.startingmoney, self.until + 1, self.stats.history)
+        self.__compile()
+
+    def __compile(self) -> None:
+        '''
+        Helper function to compile the schedule for the config and reset the state of its rules.
+        '''
+        self.compiled: CompiledSchedule | None = (
+            self.schedule.compile(self.config) if self.schedule is not None else None)
+        rules: int = len(self.schedule.rules) if self.schedule is not None else 0
+        # Factors of the fired rules per type and field, and whether every rule has fired
+        self.factors: np.ndarray = np.ones((1, len(TYPES), len(FIELDS)))
+        self.fired: np.ndarray = np.zeros((1, rules), dtype=np.bool_)
+        # Whether the factors changed since the params were last set
+        self.rescaled: bool = False
+
+    def __apply_schedule(self, step: int) -> None:
+        '''
+        Helper function to set the params in effect on the step, if they changed.
+        '''
+        compiled: CompiledSchedule = self.compiled  # type: ignore
+        if not self.rescaled and not (step < len(compiled.changed) and compiled.changed[step]):
+            return
 
-    def __parse_output(self, text: str) -> Tuple[int, int, int]:
+        until: int = FIELDS.index("until")
+        for code, name in enumerate(TYPES):
+            values: List[int | float] = (compiled.at(step)[code] * self.factors[0, code]).tolist()
+            values[until] = int(values[until])
+            self.company.change_insurance_params(name, values)
+        self.rescaled = False
+
+    def __phase(self, step: int, name: str, start: float) -> float:
         '''
-        Helper function to parse the text for life, car and home insurance sales info.
+        Helper function to pass the phase that began at start to the hooks, returns the start of the next one.
         '''
-        life, car, home, _ = text.split(";")[1:]
-        life_amount = int(life[:life.index("life")])
-        car_amount = int(car[:car.index("car")])
-        home_amount = int(home[:home.index("home")])
+        end: float = time.perf_counter()
+        book: int = len(self.company.book)
+        for hook in self.hooks:
+            hook.phase(step, name, start, end - start, book)
 
-        return (life_amount, car_amount, home_amount)
+        return time.perf_counter()
 
-    def step(self) -> Tuple[str, bool]:
+    def step(self) -> Tuple[StepResult, bool]:
         '''
         Progress the simulation for one step.
         '''
-        change: float = 0
+        step: int = self.stats.step + 1
+        if self.compiled is not None:
+            self.__apply_schedule(step)
+        timed: bool = bool(self.hooks)
+        start: float = time.perf_counter() if timed else 0.0
 
         # Paying taxes
-        text, c = self.company.pay_taxes()
-        change += c
+        taxes: float = self.company.pay_taxes()
+        if timed:
+            start = self.__phase(step, "taxes", start)
         # Stopping insurances
-        self.company.stop_insurances(self.stats.step + 1)
+        self.company.stop_insurances(step)
+        if timed:
+            start = self.__phase(step, "expiry", start)
 
         # Selling new insurances
-        for i in ["life", "car", "home"]:
-            text_, c = self.company.sell_insurance(i)
-            text += "; " + text_
-            change += c
-        
-        text_, c = self.company.payout()
-        text += "; " + text_
-        change += c
-
-        self.stats.add_step(self.__parse_output(text), change, c)
-
-        text = f"Money: {round(self.stats.money[-1][1], 2)}; " + text
-
-        if self.stats.step == self.until:
-            return text, False
-        else:
-            return text, True
+        sold: List[int] = []
+        income: List[float] = []
+        for i in TYPES:
+            amount, change = self.company.sell_insurance(i)
+            sold.append(amount)
+            income.append(change)
+            if timed:
+                start = self.__phase(step, f"sales {i}", start)
+
+        payout: float = self.company.payout()
+        if timed:
+            start = self.__phase(step, "payout", start)
+
+        self.stats.add_step(sold, sum(income) - taxes - payout, payout)
+        if timed:
+            self.__phase(step, "stats", start)
+
+        if self.compiled is not None and self.fired.size:
+            balance: np.ndarray = self.stats.balance
+            firing: np.ndarray = self.compiled.fire(balance[-2:-1], balance[-1:], self.fired)
+            if firing.any():
+                self.compiled.scale(self.factors, firing)
+                self.rescaled = True
+
+        result = StepResult(self.stats.step, taxes, tuple(sold), tuple(income),
+                            payout, float(self.stats.balance[-1]))
+
+        return result, self.stats.step != self.until
+
+
+if __name__ == "__main__":
+    from cli import main
+    main()
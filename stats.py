@@ -1,34 +1,124 @@
-from typing import List, Tuple
+import numpy as np
+
+from typing import Dict, Sequence
+from insurances import TYPES
 
 
 class Statistics:
     '''
     Class for counting stats of the experiment.
+
+    The series are kept in preallocated arrays that grow geometrically, and
+    the properties return views of the filled part without copying. A view
+    stays valid until an add_step that has to grow the arrays.
+
+    Without history only the last two steps are kept, enough for the balance
+    of the step before, and the series hold just those rows, so the memory
+    does not grow with the length of the run.
     '''
 
-    def __init__(self, startingmoney: float) -> None:
+    def __init__(self, startingmoney: float, capacity: int = 64, history: bool = True) -> None:
         '''
-        Constructor for the class.
+        Constructor for the class, capacity is the expected amount of steps plus one.
         '''
+        capacity = max(capacity, 1) if history else 2
         # The step number
         self.step: int = 0
-        # Tuple containing step and balance
-        self.money: List[Tuple[int, float]] = [(self.step, startingmoney)]
-        # Tuple containing how much insurances was sold
-        self.sold: List[Tuple[int, int, int]] = [(0, 0, 0)]
-        self.payouts: List[float] = [0]
+        # Whether all steps are kept, and the step of the first row kept
+        self.history: bool = history
+        self.__first: int = 0
+        # Rows containing step and balance
+        self.__money: np.ndarray = np.empty((capacity, 2), dtype=np.float64)
+        self.__money[0] = (self.step, startingmoney)
+        # Rows containing how much insurances was sold, one column per type
+        self.__sold: np.ndarray = np.zeros((capacity, len(TYPES)), dtype=np.int64)
+        # Payouts made so far
+        self.__payouts: np.ndarray = np.zeros(capacity, dtype=np.float64)
+
+    @property
+    def money(self) -> np.ndarray:
+        '''
+        Rows containing step and balance.
+        '''
+        return self.__money[:self.step + 1 - self.__first]
+
+    @property
+    def steps(self) -> np.ndarray:
+        '''
+        The step numbers.
+        '''
+        return self.__money[:self.step + 1 - self.__first, 0]
+
+    @property
+    def balance(self) -> np.ndarray:
+        '''
+        The balance on every step.
+        '''
+        return self.__money[:self.step + 1 - self.__first, 1]
+
+    @property
+    def sold(self) -> np.ndarray:
+        '''
+        Insurances sold so far on every step, one column per type.
+        '''
+        return self.__sold[:self.step + 1 - self.__first]
 
-    def __tuple_sum(self, fst: Tuple[int, int, int], snd: Tuple[int, int, int]) -> Tuple[int, int, int]:
+    @property
+    def payouts(self) -> np.ndarray:
         '''
-        A helper function to sum tuples.
+        Payouts made so far on every step.
         '''
-        return (fst[0] + snd[0], fst[1] + snd[1], fst[2] + snd[2])
+        return self.__payouts[:self.step + 1 - self.__first]
 
-    def add_step(self, sold: Tuple[int, int, int], change: float, payout: float) -> None:
+    def state(self) -> Dict[str, np.ndarray]:
         '''
-        Add a step to the statistics class fields.
+        Arrays holding the whole state of the statistics.
+        '''
+        return {"money": self.money, "sold": self.sold, "payouts": self.payouts}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, np.ndarray], capacity: int = 64,
+                   history: bool = True) -> "Statistics":
         '''
+        Make the statistics back from their state.
+        '''
+        if not history:
+            state = {name: array[-2:] for name, array in state.items()}
+        steps: int = len(state["payouts"])
+        stats = cls(float(state["money"][0, 1]), max(capacity, steps), history)
+        stats.step = int(state["money"][-1, 0])
+        stats.__first = stats.step - steps + 1
+        stats.__money[:steps] = state["money"]
+        stats.__sold[:steps] = state["sold"]
+        stats.__payouts[:steps] = state["payouts"]
+
+        return stats
+
+    def __grow(self) -> None:
+        '''
+        Helper function to double the capacity of the arrays.
+        '''
+        capacity: int = 2 * len(self.__payouts)
+        self.__money = np.resize(self.__money, (capacity, 2))
+        self.__sold = np.resize(self.__sold, (capacity, len(TYPES)))
+        self.__payouts = np.resize(self.__payouts, capacity)
+
+    def add_step(self, sold: Sequence[int], change: float, payout: float) -> None:
+        '''
+        Add a step to the statistics class fields, payout is the positive amount paid.
+        '''
+        if self.step + 1 - self.__first == len(self.__payouts):
+            if self.history:
+                self.__grow()
+            else:
+                # The last row moves to the front and the oldest one is dropped
+                for column in (self.__money, self.__sold, self.__payouts):
+                    column[0] = column[-1]
+                self.__first = self.step
+
         self.step += 1
-        self.money.append((self.step, self.money[-1][1] + change))
-        self.sold.append(self.__tuple_sum(self.sold[-1], sold))
-        self.payouts.append(self.payouts[-1] - payout)
+        row: int = self.step - self.__first
+        self.__money[row, 0] = self.step
+        self.__money[row, 1] = self.__money[row - 1, 1] + change
+        self.__sold[row] = self.__sold[row - 1] + sold
+        self.__payouts[row] = self.__payouts[row - 1] + payout
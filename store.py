@@ -0,0 +1,157 @@
+import json
+import os
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+from batch import BatchPartial, BatchResult, replica_seeds
+from config import Config, as_config
+from insurances import TYPES
+from simulation import Simulation
+
+# Version of the store layout
+VERSION: int = 1
+# Name of the header file in the store directory
+HEADER: str = "store.json"
+
+
+class ResultStore:
+    '''
+    Class for the per-step results of many replicas, kept on disk as one .npy file per metric.
+
+    Every metric has one row per replica and one column per step, the files
+    are memory mapped, so only the slices that are used are ever read.
+    '''
+
+    def __init__(self, path: str | Path, mode: str = "r") -> None:
+        '''
+        Constructor that opens an existing store, mode is "r" or "r+".
+        '''
+        # Directory of the store
+        self.path: Path = Path(path)
+        # Contents of the header
+        self.header: Dict[str, Any] = json.loads((self.path / HEADER).read_text())
+        if self.header["version"] != VERSION:
+            raise ValueError(f"unsupported store version {self.header['version']}")
+        # Amount of replicas and of steps, not counting step 0
+        self.replicas: int = self.header["replicas"]
+        self.steps: int = self.header["steps"]
+        # Memory mapped metrics by name
+        self.metrics: Dict[str, np.ndarray] = {
+            name: np.load(self.path / f"{name}.npy", mmap_mode=mode) for name in self.header["metrics"]}
+
+    @staticmethod
+    def layout(replicas: int, steps: int) -> Dict[str, Tuple[str, Tuple[int, ...]]]:
+        '''
+        Data type and shape of every metric.
+        '''
+        return {
+            # Balance per step
+            "balance": ("float64", (replicas, steps + 1)),
+            # Payouts made so far per step
+            "payouts": ("float64", (replicas, steps + 1)),
+            # Active insurances per step
+            "active": ("int64", (replicas, steps + 1)),
+            # Insurances sold so far per step, one column per type
+            "sold": ("int64", (replicas, steps + 1, len(TYPES))),
+        }
+
+    @classmethod
+    def create(cls, path: str | Path, config: Config, replicas: int, seed: int | None = None) -> "ResultStore":
+        '''
+        Make an empty store for the replicas of the config and open it for writing.
+        '''
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        layout: Dict[str, Tuple[str, Tuple[int, ...]]] = cls.layout(replicas, config.until)
+        for name, (dtype, shape) in layout.items():
+            np.lib.format.open_memmap(path / f"{name}.npy", mode="w+", dtype=dtype, shape=shape).flush()
+
+        (path / HEADER).write_text(json.dumps({
+            "version": VERSION, "config": config.to_dict(), "digest": config.digest(),
+            "seed": seed, "replicas": replicas, "steps": config.until, "types": list(TYPES),
+            "metrics": {name: {"dtype": dtype, "shape": list(shape)} for name, (dtype, shape) in layout.items()},
+        }, indent=2))
+
+        return cls(path, "r+")
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.metrics[name]
+
+    @property
+    def config(self) -> Config:
+        '''
+        Config the replicas were run with.
+        '''
+        return Config.from_dict(self.header["config"])
+
+    def blocks(self, size: int = 4096) -> Iterator[slice]:
+        '''
+        Slices of the replicas in blocks of the given size.
+        '''
+        for start in range(0, self.replicas, size):
+            yield slice(start, min(start + size, self.replicas))
+
+    def summary(self, metric: str = "balance", quantiles: Sequence[float] = (0.05, 0.5, 0.95),
+                block: int = 4096) -> BatchResult:
+        '''
+        Per-step aggregates of a metric, reading only one block of replicas at a time.
+        '''
+        column: np.ndarray = self.metrics[metric]
+        return BatchResult([BatchPartial(np.asarray(column[i], dtype=np.float64)) for i in self.blocks(block)],
+                           quantiles)
+
+    def flush(self) -> None:
+        '''
+        Write the changed pages of the metrics to disk.
+        '''
+        for metric in self.metrics.values():
+            if isinstance(metric, np.memmap):
+                metric.flush()
+
+
+def _fill(path: Path, start: int, seeds: List[int]) -> int:
+    '''
+    Run the replicas of a chunk and write their rows straight into the store, return the amount written.
+    '''
+    store = ResultStore(path, "r+")
+    config: Config = store.config
+    for replica, seed in enumerate(seeds, start):
+        simulation = Simulation(config, seed)
+        active: np.ndarray = store["active"][replica]
+        running = True
+        while running:
+            _, running = simulation.step()
+            active[simulation.stats.step] = simulation.company.book.active()
+
+        store["balance"][replica] = simulation.stats.balance
+        store["payouts"][replica] = simulation.stats.payouts
+        store["sold"][replica] = simulation.stats.sold
+    store.flush()
+
+    return len(seeds)
+
+
+def run_to_store(path: str | Path, config: Config | str | Path = "config.json", replicas: int = 1000,
+                 seed: int | None = None, workers: int | None = None, chunk: int = 64) -> ResultStore:
+    '''
+    Run independent replicas across a process pool into a store on disk.
+
+    Replicas have the same seeds as in batch.run_batch. Workers open the store
+    themselves and write their own rows, so only the replica indices pass
+    between the processes.
+    '''
+    config = as_config(config)
+    workers = workers or os.cpu_count() or 1
+    store: ResultStore = ResultStore.create(path, config, replicas, seed)
+    seeds: List[int] = replica_seeds(seed, replicas)
+    starts: List[int] = list(range(0, replicas, chunk))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        written: int = sum(executor.map(_fill, [store.path] * len(starts), starts,
+                                        [seeds[i:i + chunk] for i in starts]))
+    if written != replicas:
+        raise RuntimeError(f"{written} of {replicas} replicas were written")
+
+    return ResultStore(store.path)
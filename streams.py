@@ -0,0 +1,35 @@
+import numpy as np
+
+from typing import List
+
+
+class RandomStreams:
+    '''
+    Class for the independent random streams of one simulation.
+
+    Every random component draws from its own generator, and all of them are
+    derived from one root seed, so a run is reproduced by its seed alone and
+    changing how one component draws does not shift the others.
+    '''
+
+    def __init__(self, seed: int | np.random.SeedSequence | None = None) -> None:
+        '''
+        Constructor for the streams, derived from the seed or from fresh entropy.
+        '''
+        # Root of all the streams
+        self.seed: np.random.SeedSequence = (seed if isinstance(seed, np.random.SeedSequence)
+                                             else np.random.SeedSequence(seed))
+        sales, occurrence, severity = self.seed.spawn(3)
+        # Noise of the amount of insurances sold
+        self.sales: np.random.Generator = np.random.default_rng(sales)
+        # Whether an insurance has a claim
+        self.occurrence: np.random.Generator = np.random.default_rng(occurrence)
+        # Severity of a claim
+        self.severity: np.random.Generator = np.random.default_rng(severity)
+
+    @staticmethod
+    def spawn(seed: int | None, amount: int) -> List["RandomStreams"]:
+        '''
+        Streams for the given amount of independent simulations derived from one seed.
+        '''
+        return [RandomStreams(i) for i in np.random.SeedSequence(seed).spawn(amount)]
@@ -0,0 +1,216 @@
+import itertools
+import json
+import math
+import os
+import numpy as np
+
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence, Set, Tuple
+from batch import replica_seeds
+from config import Config, ProductParams, as_config
+from expected import ExpectedResult, expected
+from insurances import TYPES
+from runcache import RunCache
+from simulation import Simulation
+
+# Objectives of every point, the bool tells whether bigger is better
+OBJECTIVES: Dict[str, bool] = {
+    # Mean balance on the last step
+    "balance": True,
+    # Standard deviation of the balance on the last step
+    "std": False,
+    # Share of replicas that had a negative balance at some step
+    "ruin": False,
+    # Payouts divided by premium income over the whole run
+    "payout_ratio": False,
+}
+
+
+def _normalize(grid: Dict[str, Dict[str, Sequence[float]]]) -> Dict[str, Dict[str, List[float]]]:
+    '''
+    Helper function to turn every axis of the grid, such as a range or a NumPy array, into a list of Python numbers.
+    '''
+    normalized: Dict[str, Dict[str, List[float]]] = {}
+    for name, fields in grid.items():
+        for field, values in fields.items():
+            axis: List[float] = [value.item() if isinstance(value, np.generic) else value for value in values]
+            # Durations are counted in steps, so whole numbers from a float grid are taken as integers
+            if field == "until":
+                axis = [int(value) if isinstance(value, float) and value.is_integer() else value for value in axis]
+            normalized.setdefault(name, {})[field] = axis
+
+    return normalized
+
+
+def points(config: Config, grid: Dict[str, Dict[str, Sequence[float]]]) -> Iterator[Config]:
+    '''
+    Configs for every combination of the grid values, in row-major order of the grid.
+    '''
+    axes: List[Tuple[str, str]] = [(name, field) for name, fields in grid.items() for field in fields]
+    for values in itertools.product(*(grid[name][field] for name, field in axes)):
+        products: Dict[str, Dict[str, float]] = {}
+        for (name, field), value in zip(axes, values):
+            products.setdefault(name, {})[field] = value
+
+        point: Config = config
+        for name, changes in products.items():
+            params: List[float] = list(point.products[name]._replace(**changes))
+            point = point.with_product(name, ProductParams.parse(name, params))
+        yield point
+
+
+def _evaluate(config: Config, seeds: List[int]) -> Tuple[float, ...]:
+    '''
+    Run the replicas of one point and compute its objectives.
+    '''
+    final: List[float] = []
+    ruined: int = 0
+    premium: float = 0
+    payout: float = 0
+    # Parameters do not change during a run, so the premium follows from the amounts sold
+    costs: np.ndarray = np.array([config.products[i].cost for i in TYPES], dtype=np.float64)
+
+    for seed in seeds:
+        simulation = Simulation(config, seed)
+        running = True
+        while running:
+            _, running = simulation.step()
+        stats = simulation.stats
+        premium += float(stats.sold[-1] @ costs)
+        payout += float(stats.payouts[-1])
+        final.append(float(stats.balance[-1]))
+        ruined += bool((stats.balance < 0).any())
+
+    return (float(np.mean(final)), float(np.std(final)), ruined / len(seeds),
+            payout / premium if premium else float("inf"))
+
+
+def _store(columns: Dict[str, np.ndarray], index: int, objectives: Tuple[float, ...]) -> None:
+    '''
+    Helper function to write the objectives of a point.
+    '''
+    for name, value in zip(OBJECTIVES, objectives):
+        columns[name][index] = value
+
+
+def sweep(grid: Dict[str, Dict[str, Sequence[float]]], output: str | Path,
+          config: Config | str | Path = "config.json", replicas: int = 100,
+          seed: int | None = None, workers: int | None = None, cache: bool | RunCache = True) -> Path:
+    '''
+    Run a batch of replicas for every point of the grid and store the results column by column.
+
+    The grid maps a product to the values of its parameters, for example
+    {"life": {"cost": [5, 10], "until": [1, 2]}}. Every point runs on the same
+    replica seeds, so the points differ only by their parameters. Results go to
+    one .npy file per column in the output directory, written as points finish.
+    The objectives of a point already run with the same seeds are served from
+    the run cache, cache=False turns that off.
+    '''
+    config = as_config(config)
+    grid = _normalize(grid)
+    workers = workers or os.cpu_count() or 1
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+
+    pairs: List[Tuple[str, str]] = [(name, field) for name, fields in grid.items() for field in fields]
+    axes: List[str] = [f"{name}_{field}" for name, field in pairs]
+    size: int = int(np.prod([len(values) for fields in grid.values() for values in fields.values()]))
+    (output / "sweep.json").write_text(json.dumps({
+        "config": config.to_dict(), "grid": grid, "replicas": replicas, "seed": seed,
+        "points": size, "parameters": axes, "objectives": list(OBJECTIVES)}, indent=2))
+
+    columns: Dict[str, np.ndarray] = {
+        name: np.lib.format.open_memmap(output / f"{name}.npy", mode="w+", dtype=np.float64, shape=(size,))
+        for name in [*axes, *OBJECTIVES]}
+
+    seeds: List[int] = replica_seeds(seed, replicas)
+    # Replicas of an unseeded batch never repeat, so they are not worth keeping
+    runs: RunCache = RunCache.resolve(cache if seed is not None else False)
+    # Cache entry of every point, only the parent reads and writes the cache
+    keys: List[str] = []
+    pending: Dict[Future, int] = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for index, point in enumerate(points(config, grid)):
+            for axis, (name, field) in zip(axes, pairs):
+                columns[axis][index] = getattr(point.products[name], field)
+
+            keys.append(RunCache.key(point, seed, kind="sweep", replicas=replicas))
+            cached: Dict[str, np.ndarray] | None = runs.get(keys[index])
+            if cached is not None and len(cached.get("objectives", ())) == len(OBJECTIVES):
+                _store(columns, index, tuple(cached["objectives"].tolist()))
+                continue
+
+            # Only a few points are in flight, so the sweep can be of any size
+            if len(pending) >= 2 * workers:
+                done: Set[Future] = wait(pending, return_when=FIRST_COMPLETED).done
+                for future in done:
+                    point_index: int = pending.pop(future)
+                    _store(columns, point_index, future.result())
+                    runs.put(keys[point_index], {"objectives": np.array(future.result())})
+            pending[executor.submit(_evaluate, point, seeds)] = index
+
+        for future in wait(pending).done:
+            _store(columns, pending[future], future.result())
+            runs.put(keys[pending[future]], {"objectives": np.array(future.result())})
+
+    for column in columns.values():
+        column.flush()
+
+    return output
+
+
+def screen(grid: Dict[str, Dict[str, Sequence[float]]], config: Config | str | Path = "config.json",
+           objectives: Sequence[str] = ("ruin", "balance"), top: int = 10) -> List[Dict[str, float]]:
+    '''
+    The best points of the grid by the exact expected values, without running any replicas.
+
+    Balance, std and payout_ratio are exact, the latter as a ratio of the means.
+    Ruin is the largest chance of a negative balance on a single step under a
+    normal approximation, a lower bound of the ruin of sampled runs. Screened
+    points are meant to be swept with replicas afterwards.
+    '''
+    config = as_config(config)
+    grid = _normalize(grid)
+    pairs: List[Tuple[str, str]] = [(name, field) for name, fields in grid.items() for field in fields]
+
+    rows: List[Dict[str, float]] = []
+    for point in points(config, grid):
+        exact: ExpectedResult = expected(point)
+        ruin: float = max((0.5 * math.erfc(mean / math.sqrt(2 * var)) if var > 0 else float(mean < 0))
+                          for mean, var in zip(exact.money.tolist(), exact.money_var.tolist()))
+        rows.append({
+            **{f"{name}_{field}": float(getattr(point.products[name], field)) for name, field in pairs},
+            "balance": float(exact.money[-1]), "std": float(exact.std[-1]), "ruin": ruin,
+            "payout_ratio": float(exact.payouts[-1] / exact.premium[-1]) if exact.premium[-1] else float("inf"),
+        })
+
+    # Sorted by the last objective first, so that earlier ones take precedence
+    for name in reversed(objectives):
+        rows.sort(key=lambda row: row[name], reverse=OBJECTIVES[name])
+
+    return rows[:top]
+
+
+def load(output: str | Path) -> Dict[str, np.ndarray]:
+    '''
+    Columns of a stored sweep, memory mapped so nothing is read until used.
+    '''
+    output = Path(output)
+    header = json.loads((output / "sweep.json").read_text())
+
+    return {name: np.load(output / f"{name}.npy", mmap_mode="r")
+            for name in [*header["parameters"], *header["objectives"]]}
+
+
+def rank(output: str | Path, objectives: Sequence[str] = ("ruin", "balance"),
+         top: int = 10) -> List[Dict[str, float]]:
+    '''
+    The best points of a stored sweep, ordered by the objectives in turn.
+    '''
+    columns: Dict[str, np.ndarray] = load(output)
+    # Later keys of lexsort are compared first, and every key is sorted ascending
+    keys: List[np.ndarray] = [-columns[i] if OBJECTIVES[i] else columns[i] for i in reversed(objectives)]
+    order: np.ndarray = np.lexsort(keys)[:top]
+
+    return [{name: float(column[i]) for name, column in columns.items()} for i in order]
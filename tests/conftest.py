@@ -0,0 +1,7 @@
+import sys
+
+from pathlib import Path
+
+# Root of the repository, the simulation modules are imported from there
+ROOT: Path = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from accumulators import PathStats, TDigest, Welford, run_streaming
+from conftest import ROOT
+
+# Levels the quantiles of the sketches are checked at
+LEVELS: np.ndarray = np.array([0.001, 0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99, 0.999])
+
+
+@pytest.mark.parametrize("sizes", [[1000], [1, 999], [300, 0, 7, 693], [1] * 50 + [950]])
+def test_welford_merge_matches_whole(sizes: list) -> None:
+    '''
+    Accumulators of the parts merged together give the mean and variance of all values at once.
+    '''
+    values = np.random.default_rng(4).normal(1e6, 3.0, size=(1000, 3))
+    parts = np.split(values, np.cumsum(sizes)[:-1])
+    merged = Welford((3,))
+    for part in parts:
+        accumulator = Welford((3,))
+        for chunk in np.array_split(part, 3):
+            accumulator.update(chunk)
+        merged.merge(accumulator)
+
+    assert merged.count == len(values)
+    assert np.allclose(merged.mean, values.mean(axis=0), rtol=1e-12, atol=0)
+    assert np.allclose(merged.var, values.var(axis=0), rtol=1e-9, atol=0)
+
+
+def test_welford_empty() -> None:
+    '''
+    Merging or updating with nothing leaves an accumulator as it is.
+    '''
+    accumulator = Welford()
+    accumulator.update([2.0, 4.0])
+    accumulator.merge(Welford())
+    accumulator.update([])
+
+    assert accumulator.count == 2 and accumulator.mean == 3.0 and accumulator.var == 1.0
+
+
+@pytest.mark.parametrize("parts", [1, 4, 37])
+def test_tdigest_merge_matches_quantiles(parts: int) -> None:
+    '''
+    Sketches of the parts merged together estimate the quantiles of all values, close to a single sketch.
+    '''
+    values = np.random.default_rng(5).lognormal(0, 1, size=100_000)
+    single = TDigest()
+    single.update(values)
+    merged = TDigest()
+    for part in np.array_split(values, parts):
+        digest = TDigest()
+        digest.update(part)
+        merged.merge(digest)
+
+    exact = np.quantile(values, LEVELS)
+    # Ranks of the estimates in the sorted values, the sketch is the more accurate the closer a level is to the tails
+    ranks = np.searchsorted(np.sort(values), merged.quantile(LEVELS)) / len(values)
+    assert (np.abs(ranks - LEVELS) < 0.02 * np.minimum(LEVELS, 1 - LEVELS) + 1e-4).all()
+    assert np.allclose(merged.quantile(LEVELS), single.quantile(LEVELS), rtol=0.02)
+    assert np.allclose(merged.quantile(LEVELS), exact, rtol=0.02)
+    assert merged.count == len(values)
+    assert merged.min == values.min() and merged.max == values.max()
+    assert merged.quantile([0.0, 1.0]).tolist() == [values.min(), values.max()]
+
+
+def test_path_stats() -> None:
+    '''
+    Drawdowns and ruin steps follow the balances of every replica.
+    '''
+    paths = PathStats(2, 10)
+    for balance in [[12, 8], [6, -1], [15, 3], [-2, -4]]:
+        paths.update(np.array(balance, dtype=np.float64), 1.0, 0.5)
+
+    assert paths.drawdown.tolist() == [17, 14]
+    assert paths.ruin.tolist() == [4, 2]
+    assert paths.premium.tolist() == [4, 4] and paths.payout.tolist() == [2, 2]
+
+
+def test_streaming_independent_of_workers() -> None:
+    '''
+    The summary of a seeded run is the same whatever the amount of workers.
+    '''
+    one = run_streaming(ROOT / "config.json", 40, 6, workers=1, chunk=8)
+    two = run_streaming(ROOT / "config.json", 40, 6, workers=2, chunk=8)
+
+    assert one.replicas == two.replicas == 40
+    assert one.to_dict() == two.to_dict()
+    assert np.array_equal(one.balance.mean, two.balance.mean)
+    assert np.array_equal(one.balance.m2, two.balance.m2)
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from typing import List, Tuple
+from book import CohortBook, PolicyBook
+
+
+def _reference(sales: List[Tuple[int, int]], step: int) -> int:
+    '''
+    Amount of the sales, given as expiry and count, that expire on the step or earlier.
+    '''
+    return sum(count for expiry, count in sales if expiry <= step)
+
+
+@pytest.mark.parametrize("book_type", [PolicyBook, CohortBook])
+def test_remove_expired_counts(book_type: type) -> None:
+    '''
+    Retiring matches a plain list of sales across skipped steps and compactions.
+    '''
+    rng = np.random.default_rng(1)
+    book = book_type(4)
+    sales: List[Tuple[int, int]] = []
+    step = 0
+    for _ in range(300):
+        # Steps are skipped now and then, so both ways of walking the index are used
+        step += int(rng.choice([1, 1, 1, 2, 7]))
+        for _ in range(int(rng.integers(0, 4))):
+            expiry, count = step + int(rng.integers(1, 20)), int(rng.integers(1, 6))
+            book.append(int(rng.integers(0, 3)), 1.0, expiry, 10.0, 0.0, count)
+            sales.append((expiry, count))
+
+        removed = book.remove_expired(step)
+        assert removed == _reference(sales, step)
+        sales = [i for i in sales if i[0] > step]
+        assert len(book) == sum(count for _, count in sales)
+        assert len(book.active_payouts()) == len(book)
+
+
+def test_cohorts_hold_the_same_policies() -> None:
+    '''
+    A cohort book expands to the same active payouts and types as a book of single policies.
+    '''
+    rng = np.random.default_rng(2)
+    policies, cohorts = PolicyBook(), CohortBook()
+    for step in range(1, 60):
+        for book in (policies, cohorts):
+            book.remove_expired(step)
+        code, expiry, payout, count = (int(rng.integers(0, 3)), step + int(rng.integers(1, 10)),
+                                       float(rng.integers(1, 9)), int(rng.integers(0, 5)))
+        for book in (policies, cohorts):
+            book.append(code, 1.0, expiry, payout, 0.0, count)
+
+        assert len(cohorts) == len(policies)
+        for code in range(3):
+            assert cohorts.active(code) == policies.active(code)
+        assert np.array_equal(np.sort(cohorts.active_payouts()), np.sort(policies.active_payouts()))
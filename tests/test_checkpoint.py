@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from pathlib import Path
+from checkpoint import fork, load, restore, save, snapshot
+from conftest import ROOT
+from simulation import Simulation
+
+
+def assert_continues(simulation: Simulation, copy: Simulation) -> None:
+    '''
+    Step both simulations to the end and check that they stay equal bit for bit.
+    '''
+    running = True
+    while running:
+        _, running = simulation.step()
+        copy.step()
+
+    assert copy.stats.step == simulation.stats.step
+    assert np.array_equal(copy.stats.balance, simulation.stats.balance)
+    assert np.array_equal(copy.stats.sold, simulation.stats.sold)
+    assert np.array_equal(copy.stats.payouts, simulation.stats.payouts)
+
+
+def _halfway(**options: object) -> Simulation:
+    '''
+    Simulation of the test config stepped to half of its run.
+    '''
+    simulation = Simulation(ROOT / "config.json", 7, **options)  # type: ignore
+    for _ in range(simulation.until // 2):
+        simulation.step()
+
+    return simulation
+
+
+@pytest.mark.parametrize("cohorts", [False, True])
+def test_restore_continues_identically(cohorts: bool) -> None:
+    '''
+    A restored snapshot continues bit for bit like the simulation it was taken of, with either book.
+    '''
+    simulation = _halfway(cohorts=cohorts)
+    assert_continues(simulation, restore(snapshot(simulation)))
+
+
+def test_file_round_trip(tmp_path: Path) -> None:
+    '''
+    A snapshot saved to a file loads back into the same simulation.
+    '''
+    simulation = _halfway()
+    save(simulation, tmp_path / "run.snapshot")
+    assert_continues(simulation, load(tmp_path / "run.snapshot"))
+
+
+def test_fork_is_independent() -> None:
+    '''
+    A fork continues like the original and changing it leaves the original alone.
+    '''
+    simulation = _halfway()
+    branch = fork(simulation)
+    branch.company.change_insurance_params("home", [40, 3, 5, 2, 1])
+    branch.step()
+
+    assert simulation.company.params["home"].cost == 20
+    assert simulation.stats.step == branch.stats.step - 1
+    assert_continues(simulation, fork(simulation))
@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+import tracemalloc
+import pytest
+
+from batch import replica_seeds
+from cli import main, records
+from conftest import ROOT
+from insurances import TYPES
+from schedule import Change, Rule, Schedule
+from simulation import Simulation
+
+# Path of the config the tests run with
+CONFIG: str = str(ROOT / "config.json")
+
+
+def test_jsonl_output(capsys: pytest.CaptureFixture) -> None:
+    '''
+    Every step of every replica is one JSON record, in the order of the steps.
+    '''
+    main([CONFIG, "-n", "5", "-s", "1", "-r", "2"])
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    assert [(i["replica"], i["step"]) for i in rows] == [(r, s) for r in range(2) for s in range(1, 6)]
+    assert all(f"{i}_sold" in rows[0] for i in TYPES)
+
+
+def test_csv_output_matches_jsonl(capsys: pytest.CaptureFixture) -> None:
+    '''
+    The CSV output has a header and the same records as the JSONL output.
+    '''
+    main([CONFIG, "-n", "4", "-s", "2", "-f", "csv"])
+    table = list(csv.DictReader(io.StringIO(capsys.readouterr().out)))
+    main([CONFIG, "-n", "4", "-s", "2"])
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    assert len(table) == len(rows) == 4
+    assert [float(i["balance"]) for i in table] == [i["balance"] for i in rows]
+
+
+@pytest.mark.parametrize("steps", ["0", "-3"])
+def test_steps_below_one_are_rejected(steps: str, capsys: pytest.CaptureFixture) -> None:
+    '''
+    A run without steps would never end, so it is a usage error.
+    '''
+    with pytest.raises(SystemExit) as error:
+        main([CONFIG, "-n", steps])
+
+    assert error.value.code == 2
+    assert "--steps" in capsys.readouterr().err
+
+
+def test_memory_does_not_grow_with_steps() -> None:
+    '''
+    Streaming a long run takes no more memory than streaming a short one.
+    '''
+    peaks = []
+    for steps in (500, 5_000):
+        tracemalloc.start()
+        for _ in records(CONFIG, steps, 1):
+            pass
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    assert peaks[1] < 1.5 * peaks[0]
+
+
+def test_records_match_full_history() -> None:
+    '''
+    Dropping the history changes nothing in the records, rules that look at the step before included.
+    '''
+    schedule = Schedule([Change(4, "home", {"payout": 3000})], [Rule("home", "cost", 1.5, 500)])
+    simulation = Simulation(CONFIG, replica_seeds(3, 1)[0], schedule=schedule)
+    running = True
+    while running:
+        _, running = simulation.step()
+
+    balances = [i["balance"] for i in records(CONFIG, None, 3, 1, schedule=schedule)]
+    assert balances == simulation.stats.balance[1:].tolist()
@@ -0,0 +1,87 @@
+import json
+import pickle
+import pytest
+
+from pathlib import Path
+from typing import Any, Dict
+from config import Config, ConfigError, ProductParams, load_config
+from conftest import ROOT
+
+
+def _data() -> Dict[str, Any]:
+    '''
+    Parsed JSON of the config the tests start from.
+    '''
+    return json.loads((ROOT / "config.json").read_text())
+
+
+@pytest.mark.parametrize("values", [
+    [5, 1, 5, 2],
+    "5, 1, 5, 2, 1",
+    [5, 1, 5, 2, "1"],
+    [5, 1, 5, True, 1],
+    [-5, 1, 5, 2, 1],
+    [5, 1.5, 5, 2, 1],
+    [5, 0, 5, 2, 1],
+    [5, 1, 0, 2, 1],
+])
+def test_product_params_rejected(values: Any) -> None:
+    '''
+    Wrong amounts, types and ranges of product values are errors naming the product.
+    '''
+    with pytest.raises(ConfigError, match="life"):
+        ProductParams.parse("life", values)
+
+
+@pytest.mark.parametrize("change", [
+    {"until": 0},
+    {"until": 2.5},
+    {"until": True},
+    {"startingmoney": "100"},
+    {"home": [20, 3, 5, 2]},
+])
+def test_config_rejected(change: Dict[str, Any]) -> None:
+    '''
+    Incorrect top-level values and products are errors.
+    '''
+    with pytest.raises(ConfigError):
+        Config.from_dict({**_data(), **change})
+
+
+def test_config_missing_keys() -> None:
+    '''
+    Every missing key is named in the error.
+    '''
+    data = _data()
+    del data["until"], data["car"]
+    with pytest.raises(ConfigError, match="until, car"):
+        Config.from_dict(data)
+    with pytest.raises(ConfigError):
+        Config.from_dict([])
+
+
+def test_cached_config_is_read_only(tmp_path: Path) -> None:
+    '''
+    The shared config cannot be changed in place, and a changed copy leaves it alone.
+    '''
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(_data()))
+    config = load_config(path)
+    assert load_config(path) is config
+
+    with pytest.raises(TypeError):
+        config.products["life"] = config.products["car"]  # type: ignore
+    changed = config.with_product("life", config.products["car"])
+
+    assert load_config(path).products["life"] != changed.products["life"]
+    assert pickle.loads(pickle.dumps(config)) == config
+
+
+def test_broken_json(tmp_path: Path) -> None:
+    '''
+    A file that is not JSON is a config error naming the file.
+    '''
+    path = tmp_path / "broken.json"
+    path.write_text("{")
+    with pytest.raises(ConfigError, match="broken.json"):
+        load_config(path)
@@ -0,0 +1,51 @@
+import numpy as np
+
+from typing import Tuple
+from config import load_config
+from conftest import ROOT
+from expected import ExpectedResult, expected
+from kernel import Kernel, KernelResult
+
+# Replicas of the kernel the exact moments are checked against
+REPLICAS: int = 20_000
+
+
+def _paths() -> Tuple[ExpectedResult, KernelResult]:
+    '''
+    Helper function for the exact moments of the config and the kernel run they are checked against.
+    '''
+    config = load_config(ROOT / "config.json")
+    return expected(config), Kernel(config, REPLICAS, 11).run()
+
+
+def test_money_matches_kernel() -> None:
+    '''
+    The mean balance of the kernel stays within sampling error of the exact mean, and so does its spread.
+    '''
+    exact, result = _paths()
+    error = np.sqrt(exact.money_var[1:] / REPLICAS)
+    assert (np.abs(result.money.mean(axis=0)[1:] - exact.money[1:]) < 4 * error).all()
+    assert np.allclose(result.money.std(axis=0)[1:], exact.std[1:], rtol=0.05)
+
+
+def test_active_matches_kernel() -> None:
+    '''
+    The active book of the kernel has the exact mean and variance.
+    '''
+    exact, result = _paths()
+    error = np.sqrt(exact.active_var[1:] / REPLICAS)
+    assert (np.abs(result.active.mean(axis=0)[1:] - exact.active[1:]) < 4 * error).all()
+    assert np.allclose(result.active.var(axis=0)[1:], exact.active_var[1:], rtol=0.1)
+
+
+def test_steps_cut_the_run() -> None:
+    '''
+    Fewer steps give the first steps of the full result, and the step 0 entries hold the starting state.
+    '''
+    config = load_config(ROOT / "config.json")
+    full, short = expected(config), expected(config, 6)
+
+    assert len(short.money) == 7
+    for field in ["money", "money_var", "active", "active_var", "premium", "payouts"]:
+        assert np.allclose(getattr(short, field), getattr(full, field)[:7])
+    assert short.money[0] == config.startingmoney and short.money_var[0] == 0
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from claims import severity_sum
+from config import load_config
+from conftest import ROOT
+from kernel import Kernel
+from simulation import Simulation
+
+# Mean and variance of one severity, uniform from 1 to 100 percent
+MEAN: float = 50.5
+VAR: float = (100 ** 2 - 1) / 12
+
+
+def test_kernel_sales_match_simulation() -> None:
+    '''
+    A kernel of one replica sells exactly what the scalar simulation sells for the same seed.
+    '''
+    config = load_config(ROOT / "config.json")
+    for seed in range(5):
+        simulation = Simulation(config, seed)
+        running = True
+        while running:
+            _, running = simulation.step()
+
+        assert np.array_equal(Kernel(config, 1, seed).run().sold[0], simulation.stats.sold[-1])
+
+
+@pytest.mark.parametrize("cells, claimants", [
+    # Few claimants per cell are drawn one by one
+    (4000, 3),
+    # Many claimants per cell are drawn as multinomial digit counts
+    (400, 5000),
+])
+def test_severity_sum_distribution(cells: int, claimants: int) -> None:
+    '''
+    Both ways of drawing give sums with the mean and variance of the per-claimant severities.
+    '''
+    amounts = np.full((2, cells // 2), claimants)
+    drawn = severity_sum(np.random.default_rng(3), amounts)
+
+    assert drawn.shape == amounts.shape
+    assert ((drawn >= claimants) & (drawn <= 100 * claimants)).all()
+    # Five standard errors of the mean and a loose bound on the variance
+    assert abs(drawn.mean() - MEAN * claimants) < 5 * np.sqrt(VAR * claimants / cells)
+    assert abs(drawn.var() / (VAR * claimants) - 1) < 0.2
+
+
+def test_severity_sum_without_claimants() -> None:
+    '''
+    Cells without claimants pay nothing on either way of drawing.
+    '''
+    rng = np.random.default_rng(4)
+    assert (severity_sum(rng, np.array([0, 0, 2]))[:2] == 0).all()
+    assert (severity_sum(rng, np.array([0, 100000]))[0] == 0)
@@ -0,0 +1,23 @@
+import numpy as np
+
+from batch import replica_seeds
+from config import load_config
+from conftest import ROOT
+from expected import expected
+from pooled import PooledSimulation
+
+
+def test_pooled_matches_expected() -> None:
+    '''
+    The mean balance of the pooled engine stays within sampling error of the exact mean.
+    '''
+    config = load_config(ROOT / "config.json")
+    for name, params in config.products.items():
+        # Different payouts make more than one pool
+        config = config.with_product(name, params._replace(payout=params.payout * (1 + len(name) % 3)))
+    exact = expected(config)
+    balance = np.array([PooledSimulation(config, seed).run().balance for seed in replica_seeds(5, 1000)])
+
+    error = np.sqrt(exact.money_var[1:] / len(balance))
+    assert (np.abs(balance.mean(axis=0)[1:] - exact.money[1:]) < 4 * error).all()
+    assert np.allclose(balance.std(axis=0)[1:], exact.std[1:], rtol=0.15)
@@ -0,0 +1,105 @@
+import os
+import numpy as np
+import pytest
+import runcache
+
+from pathlib import Path
+from batch import run_batch
+from config import load_config
+from conftest import ROOT
+from runcache import RunCache
+
+
+def _entry(cache: RunCache, name: str, size: int, mtime: float) -> str:
+    '''
+    Helper function to store an entry of about the size in bytes and date it back to the time.
+    '''
+    key: str = RunCache.key(load_config(ROOT / "config.json"), None, entry=name)
+    cache.put(key, {"data": np.zeros(size // 8)})
+    os.utime(cache.directory / f"{key}.npz", (mtime, mtime))
+    return key
+
+
+def test_round_trip(tmp_path: Path) -> None:
+    '''
+    A stored entry is read back as the same arrays, a missing or disabled one as None.
+    '''
+    cache = RunCache(tmp_path)
+    key: str = RunCache.key(load_config(ROOT / "config.json"), 3)
+    arrays = {"money": np.arange(5.0), "sold": np.arange(6).reshape(2, 3)}
+    cache.put(key, arrays)
+
+    stored = cache.get(key)
+    assert stored is not None and stored.keys() == arrays.keys()
+    assert all(np.array_equal(stored[i], arrays[i]) for i in arrays)
+    assert cache.get(RunCache.key(load_config(ROOT / "config.json"), 4)) is None
+    assert RunCache(tmp_path, enabled=False).get(key) is None
+
+
+def test_engine_version_changes_the_key(monkeypatch: pytest.MonkeyPatch) -> None:
+    '''
+    Runs of another engine version are addressed by other keys, so they are not served.
+    '''
+    config = load_config(ROOT / "config.json")
+    key: str = RunCache.key(config, 3)
+    assert RunCache.key(config, 3) == key
+
+    monkeypatch.setattr(runcache, "engine_version", lambda: "other")
+    assert RunCache.key(config, 3) != key
+
+
+def test_engine_version_follows_the_code(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    '''
+    The engine version is a hash of the engine modules and changes with any of them.
+    '''
+    for name in runcache.ENGINE:
+        (tmp_path / name).write_text("pass\n")
+    monkeypatch.setattr(runcache, "__file__", str(tmp_path / "runcache.py"))
+    runcache.engine_version.cache_clear()
+    try:
+        version: str = runcache.engine_version()
+        (tmp_path / runcache.ENGINE[-1]).write_text("pass  # edited\n")
+        runcache.engine_version.cache_clear()
+        assert runcache.engine_version() != version
+    finally:
+        runcache.engine_version.cache_clear()
+
+
+def test_evict_least_recently_used(tmp_path: Path) -> None:
+    '''
+    Eviction removes the entries used longest ago, and reading an entry counts as a use.
+    '''
+    cache = RunCache(tmp_path, limit=10 ** 9)
+    keys = [_entry(cache, str(i), 8_000, 1_000_000 + i) for i in range(4)]
+    # The oldest entry is read, so it becomes the most recent one
+    assert cache.get(keys[0]) is not None
+
+    cache.limit = 3 * (cache.directory / f"{keys[0]}.npz").stat().st_size
+    cache.evict()
+    left = {i for i in keys if (tmp_path / f"{i}.npz").exists()}
+    assert left == {keys[0], keys[3]}
+
+
+def test_put_evicts_over_the_limit(tmp_path: Path) -> None:
+    '''
+    Stores keep the cache under its limit.
+    '''
+    cache = RunCache(tmp_path, limit=50_000)
+    for i in range(20):
+        _entry(cache, str(i), 8_000, 1_000_000 + i)
+
+    assert sum(i.stat().st_size for i in tmp_path.glob("*.npz")) <= cache.limit
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_batch_served_from_cache(tmp_path: Path) -> None:
+    '''
+    A seeded batch read from the cache equals the one that was run.
+    '''
+    cache = RunCache(tmp_path)
+    cold = run_batch(ROOT / "config.json", 40, 9, workers=1, cache=cache)
+    assert len(list(tmp_path.glob("*.npz"))) == 1
+    warm = run_batch(ROOT / "config.json", 40, 9, workers=1, cache=cache)
+
+    for field in ["mean", "std", "ruin", "quantiles"]:
+        assert np.array_equal(getattr(cold, field), getattr(warm, field))
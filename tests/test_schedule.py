@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+
+from typing import Any, Dict
+from checkpoint import restore, snapshot
+from config import ConfigError, load_config
+from conftest import ROOT
+from insurances import TYPES
+from kernel import Kernel
+from schedule import FIELDS, Change, Rule, Schedule
+from simulation import Simulation
+
+
+def _run(simulation: Simulation) -> Simulation:
+    '''
+    Helper function to step the simulation to its end.
+    '''
+    running = True
+    while running:
+        _, running = simulation.step()
+
+    return simulation
+
+
+def test_compile_follows_changes() -> None:
+    '''
+    Compiled parameters are the ones of the config until a change, and the changed steps are marked.
+    '''
+    config = load_config(ROOT / "config.json")
+    schedule = Schedule([Change(9, "car", {"cost": 30}), Change(4, "home", {"payout": 3000, "until": 7})])
+    compiled = schedule.compile(config)
+    home, car = TYPES.index("home"), TYPES.index("car")
+
+    assert compiled.params.shape == (config.until + 1, len(TYPES), len(FIELDS))
+    assert np.array_equal(compiled.params[0], [list(config.products[i]) for i in TYPES])
+    assert (compiled.params[:4, home, FIELDS.index("payout")] == config.products["home"].payout).all()
+    assert (compiled.params[4:, home, FIELDS.index("payout")] == 3000).all()
+    assert (compiled.params[9:, car, FIELDS.index("cost")] == 30).all()
+    assert np.flatnonzero(compiled.changed).tolist() == [4, 9]
+    assert compiled.window == 7
+    assert not compiled.uniform_payout
+    assert np.array_equal(compiled.at(10 ** 6), compiled.params[-1])
+
+
+@pytest.mark.parametrize("changes, rules", [
+    ([Change(0, "home", {"cost": 1})], []),
+    ([Change(3, "boat", {"cost": 1})], []),
+    ([Change(3, "home", {"price": 1})], []),
+    ([], [Rule("boat", "cost", 1.5, 0)]),
+    ([], [Rule("home", "until", 2, 0)]),
+    ([], [Rule("home", "cost", 0, 0)]),
+    ([], [Rule("home", "cost", -1, 0)]),
+    ([], [Rule("home", "cost", 2, "low")]),  # type: ignore
+])
+def test_incorrect_schedule(changes: list, rules: list) -> None:
+    '''
+    Changes and rules that do not fit the products are rejected.
+    '''
+    with pytest.raises(ConfigError):
+        Schedule(changes, rules)
+
+
+@pytest.mark.parametrize("data", [
+    [],
+    {"changes": [{"home": {"cost": 1}}]},
+    {"rules": [{"product": "home", "field": "cost"}]},
+    {"changes": [{"step": 2, "home": {"cost": "free"}}]},
+])
+def test_incorrect_dict(data: Dict[str, Any]) -> None:
+    '''
+    Schedules in the wrong layout, or with changes the products do not accept, raise ConfigError.
+    '''
+    config = load_config(ROOT / "config.json")
+    with pytest.raises(ConfigError):
+        Schedule.from_dict(data).compile(config)
+
+
+def test_dict_round_trip() -> None:
+    '''
+    A schedule written out and read back is the same schedule.
+    '''
+    schedule = Schedule([Change(4, "home", {"payout": 3000})], [Rule("car", "demand", 0.5, 50, once=True)])
+    copy = Schedule.from_dict(schedule.to_dict())
+
+    assert copy.changes == schedule.changes and copy.rules == schedule.rules
+    assert copy.digest() == schedule.digest()
+
+
+def test_rules_fire_on_downward_crossings() -> None:
+    '''
+    Rules fire when the balance drops under the threshold, not while it stays there, and once rules fire once.
+    '''
+    config = load_config(ROOT / "config.json")
+    compiled = Schedule(rules=[Rule("home", "cost", 2, 100), Rule("car", "cost", 3, 100, once=True)]).compile(config)
+    fired = np.zeros((1, 2), dtype=np.bool_)
+    path = [150.0, 90.0, 80.0, 120.0, 50.0]
+
+    firing = [compiled.fire(np.array([i]), np.array([j]), fired)[0].tolist() for i, j in zip(path, path[1:])]
+    assert firing == [[True, True], [False, False], [False, False], [True, False]]
+    assert fired.all()
+
+    factors = np.ones((2, len(TYPES), len(FIELDS)))
+    compiled.scale(factors, np.array([[True, True], [False, True]]))
+    assert factors[0, TYPES.index("home"), FIELDS.index("cost")] == 2
+    assert factors[0, TYPES.index("car"), FIELDS.index("cost")] == 3
+    assert factors[1, TYPES.index("car"), FIELDS.index("cost")] == 3
+    assert (factors == 1).sum() == factors.size - 3
+
+
+def test_kernel_sales_match_simulation() -> None:
+    '''
+    With a schedule, a kernel of one replica still sells exactly what the scalar simulation sells.
+    '''
+    config = load_config(ROOT / "config.json")
+    schedule = Schedule([Change(4, "home", {"payout": 3000, "demand": 3})], [Rule("home", "cost", 1.5, 500)])
+    for seed in range(5):
+        simulation = _run(Simulation(config, seed, schedule=schedule))
+        assert np.array_equal(Kernel(config, 1, seed, schedule).run().sold[0], simulation.stats.sold[-1])
+
+
+def test_restore_keeps_fired_rules() -> None:
+    '''
+    A snapshot taken after a rule fired continues bit for bit, with the rule still counted as fired.
+    '''
+    schedule = Schedule([Change(4, "home", {"payout": 3000})], [Rule("home", "cost", 1.5, 500, once=True)])
+    simulation = Simulation(ROOT / "config.json", 7, schedule=schedule)
+    for _ in range(simulation.until // 2):
+        simulation.step()
+    copy = restore(snapshot(simulation))
+
+    assert simulation.fired.all() and copy.fired.all()
+    _run(simulation)
+    _run(copy)
+    assert np.array_equal(copy.stats.balance, simulation.stats.balance)
+    assert np.array_equal(copy.stats.sold, simulation.stats.sold)
@@ -0,0 +1,98 @@
+import queue
+import threading
+import time
+
+from typing import List, Tuple
+from simulation import Simulation, StepResult
+
+
+class SimulationWorker:
+    '''
+    Class for advancing a simulation on a background thread.
+
+    Results are put into a queue in batches, at most one batch per interval,
+    so the consumer can poll it at its own pace. Every batch comes with
+    whether the simulation is still running after it, so the consumer learns
+    about the end from the same item as the final results. Everything that
+    touches the simulation from outside has to hold the lock.
+    '''
+
+    def __init__(self, simulation: Simulation, interval: float = 0.05,
+                 lock: "threading.Lock | None" = None) -> None:
+        '''
+        Constructor for the worker, interval is the time between batches in seconds.
+        '''
+        self.simulation: Simulation = simulation
+        self.interval: float = interval
+        # Batches of results in the order of steps, each with whether the simulation runs on after it
+        self.results: queue.Queue[Tuple[List[StepResult], bool]] = queue.Queue()
+        # Lock for the simulation
+        self.lock: threading.Lock = lock if lock is not None else threading.Lock()
+        # Set while the worker is not paused
+        self.__running: threading.Event = threading.Event()
+        # Set when the worker has to exit
+        self.__stopped: threading.Event = threading.Event()
+        self.__thread: threading.Thread = threading.Thread(target=self.__run, daemon=True)
+
+    @property
+    def paused(self) -> bool:
+        '''
+        Whether the worker is paused.
+        '''
+        return not self.__running.is_set()
+
+    def start(self) -> None:
+        '''
+        Start stepping the simulation.
+        '''
+        self.__running.set()
+        self.__thread.start()
+
+    def pause(self) -> None:
+        '''
+        Stop stepping after the current step until resumed.
+        '''
+        self.__running.clear()
+
+    def resume(self) -> None:
+        '''
+        Continue stepping after a pause.
+        '''
+        self.__running.set()
+
+    def stop(self) -> None:
+        '''
+        Make the worker exit after the current step.
+        '''
+        self.__stopped.set()
+        self.__running.set()
+
+    def __run(self) -> None:
+        '''
+        Step until the end of the simulation, pushing batches of results.
+        '''
+        batch: List[StepResult] = []
+        deadline: float = time.monotonic() + self.interval
+        running: bool = True
+
+        while running:
+            if not self.__running.is_set():
+                # Flush before waiting so the consumer sees the last steps
+                if batch:
+                    self.results.put((batch, running))
+                    batch = []
+                self.__running.wait()
+            if self.__stopped.is_set():
+                break
+
+            with self.lock:
+                result, running = self.simulation.step()
+            batch.append(result)
+
+            if time.monotonic() >= deadline:
+                self.results.put((batch, running))
+                batch = []
+                deadline = time.monotonic() + self.interval
+
+        if batch or not running:
+            self.results.put((batch, running))